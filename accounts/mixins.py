@@ -1,6 +1,8 @@
 # accounts/mixins.py
 from django.contrib.auth.mixins import UserPassesTestMixin
 
+from accounts.principal import get_principal
+
 class OnlyManagersMixin(UserPassesTestMixin):
     """
     Permite acesso para:
@@ -24,7 +26,7 @@ class OnlyManagersMixin(UserPassesTestMixin):
             return True
 
         # por grupo (você sincroniza grupos = perfil)
-        if u.groups.filter(name__in=self.allowed_profiles).exists():
+        if get_principal(u).tem_grupo(*self.allowed_profiles):
             return True
 
         return False
@@ -0,0 +1,100 @@
+# accounts/principal.py
+"""
+"Principal" de autorização: tudo que as checagens de acesso precisam saber do
+usuário (perfil, gestão, grupos, centros onde é gestor, permissão de alterar
+chamado), guardado no próprio request.user; cada consulta roda no máximo uma
+vez por request, e só se for lida. Não há cache entre requests: uma permissão
+revogada vale já no request seguinte, em qualquer worker.
+"""
+from functools import cached_property
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+
+_ATTR = "_principal_cache"
+_EQUIPE_ATTR = "_equipe_cache"
+
+
+class Principal:
+    """
+    Visão do usuário para as checagens de acesso. Os atributos do próprio User
+    são lidos na hora; grupos, centros e permissão são consultados só quando
+    lidos pela primeira vez (cada call site paga apenas o que usa).
+    """
+
+    def __init__(self, user):
+        self._user = user
+        self.user_id = user.pk
+        self.is_superuser = bool(user.is_superuser)
+        self.is_staff = bool(user.is_staff)
+        self.perfil = str(getattr(user, "perfil", "") or "")
+        self.gestao = str(getattr(user, "gestao", "") or "")
+        self.setor = str(getattr(user, "setor", "") or "")
+
+    @cached_property
+    def grupos(self) -> frozenset:
+        return frozenset(self._user.groups.values_list("name", flat=True))
+
+    @cached_property
+    def centros_gestor(self) -> frozenset:
+        """ids de CostCenter onde é GESTOR ativo."""
+        CostCenterMember = apps.get_model("projetos", "CostCenterMember")
+        return frozenset(
+            CostCenterMember.objects.filter(
+                usuario_id=self.user_id, papel=CostCenterMember.Role.GESTOR, ativo=True
+            ).values_list("centro_id", flat=True)
+        )
+
+    @cached_property
+    def pode_alterar_chamado(self) -> bool:
+        return self._user.has_perm("solicitacoes.change_chamado")
+
+    def tem_grupo(self, *nomes) -> bool:
+        return not self.grupos.isdisjoint(nomes)
+
+    @property
+    def perfil_norm(self) -> str:
+        return (self.perfil or "").strip().upper()
+
+    @property
+    def eh_gestor_de_centro(self) -> bool:
+        return bool(self.centros_gestor)
+
+
+def get_principal(user):
+    """Principal do usuário (None para anônimo); calculado 1x por objeto user (request)."""
+    if user is None or not getattr(user, "is_authenticated", False):
+        return None
+    principal = getattr(user, _ATTR, None)
+    if principal is None:
+        principal = Principal(user)
+        setattr(user, _ATTR, principal)
+    return principal
+
+
+def esquecer_principal(user):
+    """Descarta o que foi memoizado no objeto (ex.: o próprio usuário mudou no request)."""
+    if user is not None:
+        user.__dict__.pop(_ATTR, None)
+        user.__dict__.pop(_EQUIPE_ATTR, None)
+
+
+# --- Equipe por gestão ---
+# ids dos usuários da gestão (campo gestao OU grupo GESTAO_<gestao>); usado pelo
+# visible_chamados_for do gestor para filtrar com IN simples (sem join/DISTINCT).
+# Também só por request: mover alguém de gestão vale já no request seguinte.
+
+def equipe_ids(user) -> frozenset:
+    """ids dos usuários da gestão do usuário (1 query, memoizada no objeto user)."""
+    gestao = (getattr(user, "gestao", "") or "").strip()
+    if not gestao:
+        return frozenset()
+    memo = getattr(user, _EQUIPE_ATTR, None)
+    if memo is not None and memo[0] == gestao:
+        return memo[1]
+    User = get_user_model()
+    por_campo = User.objects.filter(gestao=gestao).values_list("pk", flat=True)
+    por_grupo = User.objects.filter(groups__name=f"GESTAO_{gestao}").values_list("pk", flat=True)
+    ids = frozenset(por_campo.union(por_grupo))
+    setattr(user, _EQUIPE_ATTR, (gestao, ids))
+    return ids
@@ -0,0 +1,27 @@
+# accounts/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from accounts.principal import esquecer_principal
+
+User = get_user_model()
+
+# O principal só é memoizado no objeto user do request (accounts/principal.py);
+# se esse mesmo objeto muda no meio do request, o valor memoizado é descartado.
+
+
+@receiver(post_save, sender=User)
+def _principal_on_user_change(sender, instance, update_fields=None, **kwargs):
+    # login/troca de senha não mudam o principal
+    if update_fields and set(update_fields) <= {"last_login", "password"}:
+        return
+    esquecer_principal(instance)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def _principal_on_user_m2m(sender, instance, action, reverse, **kwargs):
+    # user.groups.add(...) / user.user_permissions.add(...)
+    if action in {"post_add", "post_remove", "post_clear"} and not reverse:
+        esquecer_principal(instance)
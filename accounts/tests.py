@@ -1,3 +1,71 @@
+from django.contrib.auth.models import Group
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import User
+from accounts.principal import equipe_ids, get_principal
+from core.testing import BaseTestCase, criar_usuario
+
+
+class PrincipalTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.gestor = Group.objects.create(name="Gestor")
+
+    def test_anonimo_sem_principal(self):
+        self.assertIsNone(get_principal(None))
+
+    def test_memoizado_no_objeto(self):
+        principal = get_principal(self.user)
+        with self.assertNumQueries(0):
+            self.assertIs(get_principal(self.user), principal)
+
+    def test_cada_faceta_consulta_so_o_que_le(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            principal = get_principal(user)
+            self.assertEqual(principal.perfil_norm, "COLABORADOR")
+        with self.assertNumQueries(1):  # só grupos
+            principal.tem_grupo("Gestor")
+            principal.tem_grupo("Suporte")
+        with self.assertNumQueries(1):  # só centros
+            self.assertFalse(principal.eh_gestor_de_centro)
+            self.assertEqual(principal.centros_gestor, frozenset())
+
+    def test_revogacao_vale_no_request_seguinte(self):
+        # outro request = outro objeto user: nada de cache entre requests
+        self.user.groups.add(self.gestor)
+        self.assertTrue(get_principal(User.objects.get(pk=self.user.pk)).tem_grupo("Gestor"))
+        User.objects.get(pk=self.user.pk).groups.remove(self.gestor)
+        self.assertFalse(get_principal(User.objects.get(pk=self.user.pk)).tem_grupo("Gestor"))
+
+    def test_mudanca_no_proprio_objeto_descarta_memo(self):
+        self.assertFalse(get_principal(self.user).tem_grupo("Gestor"))
+        self.user.groups.add(self.gestor)
+        self.assertTrue(get_principal(self.user).tem_grupo("Gestor"))
+        self.user.perfil = User.PERFIL_GESTOR
+        self.user.save()
+        self.assertEqual(get_principal(self.user).perfil_norm, "GESTOR")
+
+
+class EquipeTests(TestCase):
+    def setUp(self):
+        self.gestor = criar_usuario("12345678909", "gestor@enprodes.com.br", perfil=User.PERFIL_GESTOR, gestao="IVAN")
+        self.membro = criar_usuario("11144477735", "membro@enprodes.com.br", gestao="IVAN")
+        self.outro = criar_usuario("52998224725", "outro@enprodes.com.br", gestao="ANDRE")
+
+    def test_campo_gestao_e_grupo(self):
+        self.outro.groups.add(Group.objects.get(name="GESTAO_IVAN"))
+        ids = equipe_ids(User.objects.get(pk=self.gestor.pk))
+        self.assertEqual(ids, {self.gestor.pk, self.membro.pk, self.outro.pk})
+
+    def test_memoizado_no_request(self):
+        equipe_ids(self.gestor)
+        with self.assertNumQueries(0):
+            equipe_ids(self.gestor)
+
+    def test_saida_da_gestao_vale_no_request_seguinte(self):
+        self.assertIn(self.membro.pk, equipe_ids(User.objects.get(pk=self.gestor.pk)))
+        membro = User.objects.get(pk=self.membro.pk)
+        membro.gestao = "ANDRE"
+        membro.save()
+        self.assertNotIn(self.membro.pk, equipe_ids(User.objects.get(pk=self.gestor.pk)))
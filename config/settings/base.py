@@ -91,6 +91,17 @@ DATABASES = {
 TIME_ZONE = "America/Sao_Paulo"
 USE_TZ = True
 
+# === Cache ===
+# LocMem: um cache por processo. As invalidações feitas pelos signals (delete ou
+# nova versão da chave) só valem no worker que gravou; nos demais, os dados
+# derivados em cache (schema de perguntas, tipos visíveis, admin-ish, opt-outs,
+# dashboard) só se atualizam quando expiram, em CACHE_TTL_CURTO segundos.
+# Com um cache compartilhado (Redis/Memcached) esse TTL pode subir.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+CACHE_TTL_CURTO = int(os.getenv("CACHE_TTL_CURTO", "60"))
+
 # === Static / Media ===
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
@@ -135,6 +146,15 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
 
+# === Push (SSE) ===
+# Broker do pub/sub das notificações em tempo real. O LocalBroker entrega só
+# dentro do próprio processo (stand-in local para um broker externo).
+NOTIFICATIONS_PUBSUB_BROKER = os.getenv("NOTIFICATIONS_PUBSUB_BROKER", "notifications.pubsub.LocalBroker")
+
+# === "Visto" (write-behind) ===
+# Intervalo do flush em lote de ChamadoVista/SecaoVista; 0 = grava na hora.
+SOLICITACOES_VISTAS_FLUSH_SEGUNDOS = float(os.getenv("SOLICITACOES_VISTAS_FLUSH_SEGUNDOS", "5"))
+
 # === Django REST Framework (API para Angular) ===
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
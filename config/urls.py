@@ -13,6 +13,7 @@ from django.contrib import admin
 from django.urls import path, include
 
 from accounts.forms import CPFAuthenticationForm, PrettyPasswordChangeForm
+from accounts.principal import get_principal
 from solicitacoes.models import TipoSolicitacao   # ⬅️ add
 
 def health(_):
@@ -23,7 +24,7 @@ def home(request):
     is_manager = (
         request.user.is_superuser
         or getattr(request.user, "perfil", "") == "ADMIN"
-        or request.user.groups.filter(name="Gestor").exists()
+        or get_principal(request.user).tem_grupo("Gestor")
     )
     tipos = list(TipoSolicitacao.objects.order_by("nome").values("id", "nome"))
     return render(request, "home.html", {"is_manager": is_manager, "tipos_solicitacao": tipos})
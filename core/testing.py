@@ -0,0 +1,18 @@
+# core/testing.py
+"""Fixtures compartilhadas pelos testes dos apps."""
+from django.core.cache import cache
+from django.test import TestCase
+
+from accounts.models import User
+
+
+def criar_usuario(cpf, email, **extra):
+    return User.objects.create_user(cpf=cpf, password="x", email=email, nome_completo=f"Usuário {cpf}", **extra)
+
+
+class BaseTestCase(TestCase):
+    """self.user (colaborador) e cache limpo: o LocMem é compartilhado entre os testes do processo."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = criar_usuario("12345678909", "ana@enprodes.com.br")
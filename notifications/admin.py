@@ -1,10 +1,10 @@
 from django.contrib import admin
-from .models import Notification, NotificationOptOut
+from .models import Notification, NotificationCounter, NotificationOptOut
 
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ("kind", "to_email", "is_sent", "created_at", "sent_at")
+    list_display = ("kind", "to_email", "is_sent", "attempts", "created_at", "sent_at")
     list_filter = ("kind", "is_sent", "created_at")
     search_fields = ("to_email", "subject", "ref_app", "ref_model", "ref_pk")
 
@@ -13,3 +13,9 @@ class NotificationAdmin(admin.ModelAdmin):
 class NotificationOptOutAdmin(admin.ModelAdmin):
     list_display = ("email", "kind")
     search_fields = ("email", "kind")
+
+
+@admin.register(NotificationCounter)
+class NotificationCounterAdmin(admin.ModelAdmin):
+    list_display = ("email", "unread", "updated_at")
+    search_fields = ("email",)
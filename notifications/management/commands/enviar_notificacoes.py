@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.services import OUTBOX_BATCH_SIZE, dispatch_pending_emails
+
+
+class Command(BaseCommand):
+    help = "Worker do outbox: envia os e-mails pendentes (Notification) em lotes, com retry/backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Processa a fila uma vez e sai (útil em cron).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Segundos entre verificações quando a fila está vazia (padrão: 5).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=OUTBOX_BATCH_SIZE,
+            help=f"Quantidade de e-mails por lote/conexão SMTP (padrão: {OUTBOX_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        once = options["once"]
+        interval = max(0.5, options["interval"])
+        batch_size = max(1, options["batch_size"])
+
+        self.stdout.write(self.style.NOTICE("Worker de notificações iniciado."))
+        try:
+            while True:
+                # esvazia a fila antes de dormir
+                while True:
+                    result = dispatch_pending_emails(batch_size=batch_size)
+                    processados = result["sent"] + result["failed"] + result["skipped"]
+                    if processados:
+                        self.stdout.write(
+                            f"Lote: {result['sent']} enviado(s), {result['failed']} falha(s), "
+                            f"{result['skipped']} com opt-out."
+                        )
+                    if processados < batch_size:
+                        break
+                if once:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Worker de notificações finalizado."))
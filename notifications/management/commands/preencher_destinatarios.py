@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Lower, Trim
+
+from notifications.models import Notification
+from notifications.utils import user_ids_by_email
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche Notification.recipient (e-mail normalizado) e to_user nas linhas antigas, "
+        "em blocos de IDs para não travar a tabela."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Quantidade de IDs por bloco (padrão: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        chunk = max(1, options["chunk_size"])
+        last_id = Notification.objects.aggregate(m=Max("id"))["m"] or 0
+        total_recipient = total_user = 0
+
+        start = 0
+        while start < last_id:
+            end = start + chunk
+            with transaction.atomic():
+                bloco = Notification.objects.filter(pk__gt=start, pk__lte=end)
+
+                total_recipient += bloco.filter(recipient="").update(recipient=Lower(Trim("to_email")))
+
+                sem_user = bloco.filter(to_user__isnull=True).exclude(recipient="")
+                recipients = set(sem_user.values_list("recipient", flat=True).distinct())
+                for email, user_id in user_ids_by_email(recipients).items():
+                    total_user += sem_user.filter(recipient=email).update(to_user_id=user_id)
+            start = end
+            self.stdout.write(f"... até id {min(end, last_id)}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Concluído: recipient preenchido em {total_recipient} linha(s), to_user em {total_user}."
+            )
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from notifications.services import reconstruir_contadores
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula do zero os contadores de não lidas (NotificationCounter) a partir das "
+        "notificações web. Use após deletes/cargas em massa que não passam por bump/drop."
+    )
+
+    def handle(self, *args, **options):
+        total = reconstruir_contadores()
+        self.stdout.write(self.style.SUCCESS(f"Contadores reconstruídos: {total} destinatário(s)."))
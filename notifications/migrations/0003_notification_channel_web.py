@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='channel',
+            field=models.CharField(choices=[('email', 'E-mail'), ('web', 'Web (sininho)')], default='email', max_length=16),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:18
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower, Trim
+
+
+def backfill_counters(apps, schema_editor):
+    Notification = apps.get_model("notifications", "Notification")
+    NotificationCounter = apps.get_model("notifications", "NotificationCounter")
+    # mesma chave de services.bump_unread (normalize_recipient: strip + lower)
+    rows = (
+        Notification.objects.filter(channel="web")
+        .order_by()
+        .annotate(email_norm=Lower(Trim("to_email")))
+        .values("email_norm")
+        .annotate(qtd=Count("id"))
+    )
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(email=r["email_norm"], unread=r["qtd"]) for r in rows if r["email_norm"]],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notification_channel_web'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('unread', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, transaction
+from django.db.models import Max
+from django.db.models.functions import Lower, Trim
+
+BLOCO = 1000
+
+
+def preencher_recipient(apps, schema_editor):
+    # linhas anteriores à 0005 ficaram com recipient="" e sumiriam das telas
+    # (list/dropdown/mark_read filtram por recipient); um bloco de IDs por transação
+    Notification = apps.get_model("notifications", "Notification")
+    last_id = Notification.objects.aggregate(m=Max("id"))["m"] or 0
+    for start in range(0, last_id, BLOCO):
+        with transaction.atomic(using=schema_editor.connection.alias):
+            Notification.objects.filter(pk__gt=start, pk__lte=start + BLOCO, recipient="").update(
+                recipient=Lower(Trim("to_email"))
+            )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('notifications', '0005_notification_recipient_to_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_recipient, migrations.RunPython.noop),
+    ]
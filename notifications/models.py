@@ -1,16 +1,28 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
 
+def normalize_recipient(email: str) -> str:
+    return (email or "").strip().lower()
+
+
 class Notification(models.Model):
     class Channel(models.TextChoices):
         EMAIL = "email", "E-mail"
+        WEB = "web", "Web (sininho)"
 
     # tipo genérico (para reuso entre apps): ex. "ticket.created", "ticket.reply", "ticket.status"
     kind = models.CharField(max_length=64)
     channel = models.CharField(max_length=16, choices=Channel.choices, default=Channel.EMAIL)
 
     to_email = models.EmailField()
+    # chave normalizada (minúsculas) do destinatário: substitui to_email__iexact nas consultas
+    recipient = models.CharField(max_length=254, blank=True, default="")
+    to_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="notifications",
+    )
     subject = models.CharField(max_length=200)
     body_text = models.TextField(blank=True)
     body_html = models.TextField(blank=True)
@@ -21,13 +33,29 @@ class Notification(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     sent_at = models.DateTimeField(null=True, blank=True)
 
+    # outbox (e-mail): tentativas de envio e quando o worker pode tentar de novo
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
     # referência cruzada opcional
     ref_app = models.CharField(max_length=50, blank=True)    # ex: "solicitacoes"
     ref_model = models.CharField(max_length=50, blank=True)  # ex: "Chamado"
     ref_pk = models.CharField(max_length=50, blank=True)     # ex: "123"
 
     class Meta:
-        indexes = [models.Index(fields=["kind", "created_at"])]
+        indexes = [
+            models.Index(fields=["kind", "created_at"]),
+            models.Index(fields=["channel", "is_sent", "next_attempt_at"]),
+            models.Index(fields=["recipient", "channel", "created_at"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        # bulk_create não passa por aqui: quem cria em lote preenche recipient
+        self.recipient = normalize_recipient(self.to_email)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "to_email" in update_fields:
+            kwargs["update_fields"] = set(update_fields) | {"recipient"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         status = "sent" if self.is_sent else "pending"
@@ -44,3 +72,16 @@ class NotificationOptOut(models.Model):
 
     def __str__(self):
         return f"{self.email} (kind={self.kind or 'GLOBAL'})"
+
+
+class NotificationCounter(models.Model):
+    """
+    Contador desnormalizado de notificações web não lidas por destinatário.
+    Incrementado no fan-out e decrementado no mark_read (ver services.py).
+    """
+    email = models.EmailField(unique=True)  # sempre em minúsculas
+    unread = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.email}: {self.unread} não lida(s)"
@@ -0,0 +1,116 @@
+# notifications/pubsub.py
+"""
+Pub/sub em processo para o canal de push (SSE).
+
+O broker é configurável (settings.NOTIFICATIONS_PUBSUB_BROKER); o padrão,
+LocalBroker, entrega só para conexões do próprio processo e serve de
+stand-in local para um broker externo com a mesma interface
+(subscribe/unsubscribe/publish). Com vários workers um evento publicado em
+um não chega aos streams dos outros: o push é só aceleração, e o navbar
+mantém um poll lento mesmo conectado (pollWhenOffline).
+
+DASHBOARD_TOPIC vai para todo usuário logado, então o evento não leva dados
+de chamado: é só "recarregue", e cada cliente relê pela view com permissão.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Tópicos
+STAFF_TOPIC = "staff"          # admin-ish (novas mensagens de qualquer chamado)
+DASHBOARD_TOPIC = "dashboard"  # mudanças que afetam os cards/gráfico (evento sem payload)
+
+
+def user_topic(email: str) -> str:
+    return f"user:{(email or '').strip().lower()}"
+
+
+class Subscription:
+    """Fila assíncrona de uma conexão; pode receber mensagens de qualquer thread."""
+
+    def __init__(self, broker, topics, maxsize: int = 100):
+        self.broker = broker
+        self.topics = set(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # loop já encerrado (conexão caiu)
+            self.broker.unsubscribe(self)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # cliente lento: descarta; o poll de fallback recupera o estado
+            pass
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    def __init__(self):
+        self._subs = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics) -> Subscription:
+        sub = Subscription(self, topics)
+        with self._lock:
+            for topic in sub.topics:
+                self._subs[topic].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            for topic in sub.topics:
+                subs = self._subs.get(topic)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subs[topic]
+
+    def publish(self, topic: str, event: str, data=None):
+        message = {"event": event, "data": data or {}}
+        with self._lock:
+            subs = list(self._subs.get(topic, ()))
+        for sub in subs:
+            sub.deliver(message)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, "NOTIFICATIONS_PUBSUB_BROKER", "notifications.pubsub.LocalBroker")
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish_on_commit(topics, event: str, data=None):
+    """Publica após o commit (nada é enviado se a transação for desfeita)."""
+    if isinstance(topics, str):
+        topics = [topics]
+    topics = list(topics)
+
+    def _send():
+        broker = get_broker()
+        for topic in topics:
+            broker.publish(topic, event, data)
+
+    transaction.on_commit(_send)
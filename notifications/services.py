@@ -1,46 +1,97 @@
 # notifications/services.py
-from typing import Optional, Dict, Iterable
+from datetime import timedelta
+from typing import Optional, Dict, Iterable, List
 from django.conf import settings
-from django.contrib.auth import get_user_model
 from django.core.mail import EmailMultiAlternatives, get_connection
-from django.db import models
-from django.template.loader import render_to_string
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest, Lower, Trim
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
 from django.utils import timezone
-from .models import Notification, NotificationOptOut
+from .models import Notification, NotificationCounter, NotificationOptOut, normalize_recipient
+from .pubsub import publish_on_commit, user_topic
+from .utils import user_ids_by_email
+
+# --- Opt-out (cache) ---
+# {kind: set(emails)}; kind "" = opt-out global. Invalidado pelos signals de NotificationOptOut.
+OPTOUT_CACHE_KEY = "notifications:optouts"
+
+
+def _optout_map() -> Dict[str, set]:
+    data = cache.get(OPTOUT_CACHE_KEY)
+    if data is None:
+        data = {}
+        for email, kind in NotificationOptOut.objects.values_list("email", "kind"):
+            data.setdefault(kind or "", set()).add(normalize_recipient(email))
+        cache.set(OPTOUT_CACHE_KEY, data, settings.CACHE_TTL_CURTO)
+    return data
+
+
+def invalidate_optouts():
+    cache.delete(OPTOUT_CACHE_KEY)
+
+
+def filter_opted_out(to_emails: Iterable[str], kind: str) -> List[str]:
+    """Remove da lista quem fez opt-out (global ou do kind), sem query por destinatário."""
+    data = _optout_map()
+    blocked = data.get("", set()) | data.get(kind, set())
+    return [e for e in (to_emails or []) if normalize_recipient(e) not in blocked]
 
-User = get_user_model()
 
 def is_opted_out(email: str, kind: str) -> bool:
-    return NotificationOptOut.objects.filter(email=email).filter(
-        models.Q(kind="") | models.Q(kind=kind)
-    ).exists()
+    return not filter_opted_out([email], kind)
 
-def render_email(kind: str, context: Dict) -> Dict[str, str]:
-    base = f"notifications/emails/{kind}"
-    subject = render_to_string(f"{base}/subject.txt", context).strip()
-    body_txt = render_to_string(f"{base}/body.txt", context)
+# --- Templates de e-mail (cache por kind) ---
+# (kind, arquivo) -> Template compilado, ou None quando o arquivo não existe
+# (cache negativo: body.html é opcional e não é procurado de novo a cada envio)
+_email_templates = {}
+
+
+def get_email_template(kind: str, name: str):
+    key = (kind, name)
+    if not settings.DEBUG and key in _email_templates:
+        return _email_templates[key]
     try:
-        body_html = render_to_string(f"{base}/body.html", context)
-    except Exception:
-        body_html = ""
+        tpl = get_template(f"notifications/emails/{kind}/{name}")
+    except TemplateDoesNotExist:
+        tpl = None
+    _email_templates[key] = tpl
+    return tpl
+
+
+def render_email(kind: str, context: Dict) -> Dict[str, str]:
+    subject_tpl = get_email_template(kind, "subject.txt")
+    body_tpl = get_email_template(kind, "body.txt")
+    if subject_tpl is None or body_tpl is None:
+        raise TemplateDoesNotExist(f"notifications/emails/{kind}/(subject.txt|body.txt)")
+    html_tpl = get_email_template(kind, "body.html")
+
+    subject = subject_tpl.render(context).strip()
+    body_txt = body_tpl.render(context)
+    body_html = html_tpl.render(context) if html_tpl is not None else ""
     return {"subject": subject, "body_text": body_txt, "body_html": body_html}
 
-def _match_user(email: str):
-    if not email:
-        return None
-    try:
-        return User.objects.filter(email__iexact=email).first()
-    except Exception:
-        return None
+# --- Outbox de e-mail ---
+# Requisições só gravam Notification pendente (na mesma transação do evento);
+# o envio SMTP é feito pelo worker: python manage.py enviar_notificacoes
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BACKOFF_BASE = 30     # segundos: 30, 60, 120, 240...
+OUTBOX_LEASE_SECONDS = 300   # reserva do lote enquanto o worker envia
+
 
 def send_email(
     kind: str,
     to_email: str,
     context: Dict,
     ref: Optional[Dict] = None,
-    save_log: bool = True
 ) -> Optional[Notification]:
-
+    """
+    Enfileira um e-mail no outbox (Notification pendente). Não abre conexão SMTP.
+    Se chamado dentro de transaction.atomic(), o item só existe após o commit.
+    """
     if not to_email:
         return None
     if is_opted_out(to_email, kind):
@@ -58,40 +109,170 @@ def send_email(
         ref_app=(ref or {}).get("app", ""),
         ref_model=(ref or {}).get("model", ""),
         ref_pk=str((ref or {}).get("pk", "")),
+        next_attempt_at=timezone.now(),
     )
 
-    # Só passa to_user se o model tiver esse campo (evita TypeError)
-    maybe_user = _match_user(to_email)
-    if hasattr(Notification, "to_user") and maybe_user:
-        notif_kwargs["to_user"] = maybe_user
+    notif_kwargs["to_user_id"] = user_ids_by_email([to_email]).get(normalize_recipient(to_email))
 
-    notif: Optional[Notification] = Notification(**notif_kwargs) if save_log else None
+    return Notification.objects.create(**notif_kwargs)
 
-    try:
-        conn = get_connection()
-        email = EmailMultiAlternatives(
-            subject=payload["subject"],
-            body=payload["body_text"],
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-            to=[to_email],
-            connection=conn,
+
+def _pending_emails():
+    return Notification.objects.filter(
+        channel=Notification.Channel.EMAIL,
+        is_sent=False,
+        attempts__lt=OUTBOX_MAX_ATTEMPTS,
+        next_attempt_at__lte=timezone.now(),
+    )
+
+
+def _claim_batch(batch_size: int):
+    """
+    Reserva um lote de pendentes (empurra next_attempt_at para frente),
+    para que outro worker não pegue os mesmos itens.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            _pending_emails()
+            .select_for_update(skip_locked=True)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
         )
-        if payload["body_html"]:
-            email.attach_alternative(payload["body_html"], "text/html")
-        email.send()
+        if ids:
+            Notification.objects.filter(pk__in=ids).update(
+                next_attempt_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+            )
+    return list(Notification.objects.filter(pk__in=ids).order_by("id"))
+
 
-        if notif:
+def dispatch_pending_emails(batch_size: int = OUTBOX_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Envia um lote do outbox reutilizando UMA conexão SMTP.
+    Falhas voltam para a fila com backoff exponencial até OUTBOX_MAX_ATTEMPTS.
+    """
+    batch = _claim_batch(batch_size)
+    result = {"sent": 0, "failed": 0, "skipped": 0}
+    # opt-out feito depois do enfileiramento vale já: conferido no banco, não no cache
+    blocked = _opted_out_now(batch)
+    if blocked:
+        _mark_skipped(blocked)
+        result["skipped"] = len(blocked)
+        batch = [n for n in batch if n not in blocked]
+    if not batch:
+        return result
+
+    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", None)
+    conn = get_connection()
+    try:
+        conn.open()
+    except Exception as e:
+        # sem conexão: devolve o lote inteiro para a fila
+        for notif in batch:
+            _mark_failed(notif, e)
+        result["failed"] = len(batch)
+        return result
+
+    try:
+        for notif in batch:
+            email = EmailMultiAlternatives(
+                subject=notif.subject,
+                body=notif.body_text,
+                from_email=from_email,
+                to=[notif.to_email],
+                connection=conn,
+            )
+            if notif.body_html:
+                email.attach_alternative(notif.body_html, "text/html")
+            try:
+                email.send()
+            except Exception as e:
+                _mark_failed(notif, e)
+                result["failed"] += 1
+                continue
             notif.is_sent = True
             notif.sent_at = timezone.now()
-            notif.save()
-    except Exception as e:
-        if notif:
-            notif.error = str(e)[:1000]
-            notif.save()
-        else:
-            # quando não salva log, propaga para não silenciar erros de envio
-            raise
-    return notif
+            notif.error = ""
+            notif.attempts += 1
+            notif.save(update_fields=["is_sent", "sent_at", "error", "attempts"])
+            result["sent"] += 1
+    finally:
+        conn.close()
+    return result
+
+
+def _opted_out_now(batch) -> List[Notification]:
+    """Itens do lote cujo destinatário tem opt-out (global ou do kind), em 1 query."""
+    recipients = {normalize_recipient(n.to_email) for n in batch}
+    rows = (
+        NotificationOptOut.objects.annotate(norm=Lower(Trim("email")))
+        .filter(norm__in=recipients)
+        .values_list("norm", "kind")
+    )
+    optouts = {(email, kind or "") for email, kind in rows}
+    return [
+        n for n in batch
+        if {(normalize_recipient(n.to_email), ""), (normalize_recipient(n.to_email), n.kind)} & optouts
+    ]
+
+
+def _mark_skipped(batch):
+    # sai da fila sem ser enviado (attempts no limite); fica registrado o motivo
+    Notification.objects.filter(pk__in=[n.pk for n in batch]).update(
+        attempts=OUTBOX_MAX_ATTEMPTS, error="Não enviado: destinatário fez opt-out."
+    )
+
+
+def _mark_failed(notif: Notification, exc: Exception):
+    notif.attempts += 1
+    notif.error = str(exc)[:1000]
+    delay = OUTBOX_BACKOFF_BASE * (2 ** (notif.attempts - 1))
+    notif.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    notif.save(update_fields=["attempts", "error", "next_attempt_at"])
+
+
+def send_email_batch(
+    kind: str,
+    to_emails: Iterable[str],
+    context: Dict,
+    ref: Optional[Dict] = None,
+) -> List[Notification]:
+    """
+    Mesmo e-mail para vários destinatários: renderiza UMA vez e enfileira tudo
+    num único bulk_create. Use só quando o context não tem nada por destinatário.
+    """
+    recipients = []
+    seen = set()
+    for email in filter_opted_out(to_emails, kind):
+        email = (email or "").strip()
+        norm = normalize_recipient(email)
+        if not norm or norm in seen:
+            continue
+        seen.add(norm)
+        recipients.append(email)
+    if not recipients:
+        return []
+
+    payload = render_email(kind, context)
+    user_ids = user_ids_by_email(recipients)
+    now = timezone.now()
+    objs = [
+        Notification(
+            kind=kind,
+            to_email=email,
+            recipient=normalize_recipient(email),  # bulk_create não chama save()
+            to_user_id=user_ids.get(normalize_recipient(email)),
+            subject=payload["subject"],
+            body_text=payload["body_text"],
+            body_html=payload["body_html"],
+            ref_app=(ref or {}).get("app", ""),
+            ref_model=(ref or {}).get("model", ""),
+            ref_pk=str((ref or {}).get("pk", "")),
+            next_attempt_at=now,
+        )
+        for email in recipients
+    ]
+    return Notification.objects.bulk_create(objs)
 
 
 def send_simple_email(
@@ -101,5 +282,87 @@ def send_simple_email(
     kind: str = "generic",
     ref: Optional[Dict] = None
 ):
-    for email in to_list or []:
-        send_email(kind=kind, to_email=email, context={"subject": subject, "body": body}, ref=ref)
+    return send_email_batch(kind=kind, to_emails=to_list, context={"subject": subject, "body": body}, ref=ref)
+
+
+# --- Contador de não lidas (sininho) ---
+UNREAD_CACHE_TTL = 60 * 10
+
+
+def _unread_cache_key(email: str) -> str:
+    return f"notifications:unread:{email}"
+
+
+def unread_count(email: str) -> int:
+    """Não lidas (canal web) do destinatário: cache -> NotificationCounter."""
+    email = normalize_recipient(email)
+    if not email:
+        return 0
+    key = _unread_cache_key(email)
+    count = cache.get(key)
+    if count is None:
+        count = (
+            NotificationCounter.objects.filter(email=email)
+            .values_list("unread", flat=True)
+            .first()
+        ) or 0
+        cache.set(key, count, UNREAD_CACHE_TTL)
+    return count
+
+
+def _invalidate_unread(emails):
+    keys = [_unread_cache_key(e) for e in emails]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+    # avisa as conexões SSE (o stream relê o contador)
+    publish_on_commit([user_topic(e) for e in emails], "notifications")
+
+
+def bump_unread(to_emails, by: int = 1):
+    """Incrementa o contador de cada destinatário (2 queries, independente de N)."""
+    emails = sorted({normalize_recipient(e) for e in (to_emails or []) if normalize_recipient(e)})
+    if not emails:
+        return
+    now = timezone.now()
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(email=e, unread=0, updated_at=now) for e in emails],
+        ignore_conflicts=True,
+    )
+    NotificationCounter.objects.filter(email__in=emails).update(
+        unread=F("unread") + by, updated_at=now
+    )
+    _invalidate_unread(emails)
+
+
+def drop_unread(email: str, by: int = 1):
+    """Decrementa o contador (nunca abaixo de zero)."""
+    email = normalize_recipient(email)
+    if not email or by <= 0:
+        return
+    NotificationCounter.objects.filter(email=email).update(
+        unread=Greatest(F("unread") - by, 0), updated_at=timezone.now()
+    )
+    _invalidate_unread([email])
+
+
+def reconstruir_contadores() -> int:
+    """
+    Recalcula NotificationCounter a partir das notificações web existentes
+    (corrige divergências de bump/drop); retorna quantos destinatários.
+    """
+    contagem = dict(
+        Notification.objects.filter(channel=Notification.Channel.WEB)
+        .exclude(recipient="")
+        .order_by()
+        .values_list("recipient")
+        .annotate(n=Count("pk"))
+    )
+    now = timezone.now()
+    with transaction.atomic():
+        antigos = set(NotificationCounter.objects.values_list("email", flat=True))
+        NotificationCounter.objects.all().delete()
+        NotificationCounter.objects.bulk_create(
+            [NotificationCounter(email=e, unread=n, updated_at=now) for e, n in contagem.items()],
+            batch_size=1000,
+        )
+        _invalidate_unread(sorted(antigos | set(contagem)))
+    return len(contagem)
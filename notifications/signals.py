@@ -1,11 +1,20 @@
 # notifications/signals.py
-from django.db.models.signals import post_save, pre_save
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.utils.html import escape
 
-from notifications.services import send_simple_email
-from notifications.utils import users_adminish, emails, get_atendente_user
-from notifications.models import Notification
+from notifications.services import bump_unread, invalidate_optouts, send_simple_email
+from notifications.utils import (
+    adminish_emails,
+    get_atendente_user,
+    invalidate_adminish_emails,
+    user_ids_by_email,
+)
+from notifications.models import Notification, NotificationOptOut, normalize_recipient
+from notifications.pubsub import DASHBOARD_TOPIC, STAFF_TOPIC, publish_on_commit, user_topic
 
 from solicitacoes.models import Chamado, ChamadoMensagem
 
@@ -15,24 +24,60 @@ def _as_body_html(text: str) -> str:
 
 def _notify_web_by_emails(to_emails, subject: str, body: str, *, ref_app: str, ref_model: str, ref_pk):
     """
-    Cria itens Notification (canal 'web') para o sininho.
+    Cria itens Notification (canal 'web') para o sininho, num único bulk_create.
     """
+    body_html = _as_body_html(body)
+    user_ids = user_ids_by_email(to_emails)
+    seen = set()
+    objs = []
     for mail in (to_emails or []):
         mail = (mail or "").strip()
-        if not mail:
+        recipient = normalize_recipient(mail)
+        if not recipient or recipient in seen:
             continue
-        Notification.objects.create(
+        seen.add(recipient)
+        objs.append(Notification(
             kind="generic",
             subject=subject,
             body_text=body,
-            body_html=_as_body_html(body),
-            to_email=mail,       # <- SEM to_user
-            channel="web",
+            body_html=body_html,
+            to_email=mail,
+            recipient=recipient,  # bulk_create não chama save()
+            to_user_id=user_ids.get(recipient),
+            channel=Notification.Channel.WEB,
             ref_app=ref_app,
             ref_model=ref_model,
             ref_pk=str(ref_pk),
             is_sent=True,        # marca que “foi gerada” (não é e-mail)
-        )
+        ))
+    if objs:
+        Notification.objects.bulk_create(objs)
+        bump_unread([o.to_email for o in objs])
+    return objs
+
+
+# 0) Destinatários admin-ish (cache) -> invalida quando usuários/grupos mudam
+User = get_user_model()
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def _invalidate_adminish_on_change(sender, update_fields=None, **kwargs):
+    # login/troca de senha não mudam quem é admin-ish
+    if update_fields and set(update_fields) <= {"last_login", "password"}:
+        return
+    transaction.on_commit(invalidate_adminish_emails)
+
+@receiver(m2m_changed, sender=User.groups.through)
+def _invalidate_adminish_on_groups(sender, action, **kwargs):
+    if action in {"post_add", "post_remove", "post_clear"}:
+        transaction.on_commit(invalidate_adminish_emails)
+
+@receiver(post_save, sender=NotificationOptOut)
+@receiver(post_delete, sender=NotificationOptOut)
+def _invalidate_optouts_on_change(sender, **kwargs):
+    transaction.on_commit(invalidate_optouts)
 
 # 1) NOVO CHAMADO
 @receiver(post_save, sender=Chamado)
@@ -40,6 +85,14 @@ def on_chamado_created(sender, instance: Chamado, created: bool, **kwargs):
     if not created:
         return
 
+    publish_on_commit(DASHBOARD_TOPIC, "dashboard")  # sem payload: o cliente relê pela própria view
+    # e-mail/sininho só depois do commit: fora da transação da abertura e nada
+    # sai se ela for desfeita. robust: uma falha aqui é só logada — o chamado já
+    # foi gravado e um 500 levaria o usuário a reenviar (chamado duplicado)
+    transaction.on_commit(lambda: _notificar_chamado_criado(instance), robust=True)
+
+
+def _notificar_chamado_criado(instance: Chamado):
     subject = f"[Enprodes] Nova solicitação #{instance.id}"
     body = (
         f"Uma nova solicitação foi aberta.\n"
@@ -51,7 +104,7 @@ def on_chamado_created(sender, instance: Chamado, created: bool, **kwargs):
     )
 
     # admins
-    admin_emails = emails(users_adminish())
+    admin_emails = adminish_emails()
     if admin_emails:
         send_simple_email(subject, body, admin_emails)
         _notify_web_by_emails(
@@ -79,6 +132,12 @@ def on_chamado_nova_mensagem(sender, instance: ChamadoMensagem, created: bool, *
     if getattr(instance, "visibilidade", vis_publica) != vis_publica:
         return
 
+    # push (SSE): solicitante + admin-ish; o stream ignora mensagens do próprio autor
+    publish_on_commit(
+        [user_topic(getattr(ch.solicitante, "email", "")), STAFF_TOPIC],
+        "nova_mensagem", {"chamado": ch.id, "autor": getattr(instance.autor, "id", None)},
+    )
+
     subject = f"[Enprodes] Nova mensagem no chamado #{ch.id}"
     body = (
         f"Houve uma nova mensagem no chamado #{ch.id}.\n"
@@ -107,7 +166,7 @@ def on_chamado_nova_mensagem(sender, instance: ChamadoMensagem, created: bool, *
         return
 
     # sem atendente: se autor é solicitante -> notifica admin-ish, senão -> notifica solicitante
-    admin_emails = emails(users_adminish())
+    admin_emails = adminish_emails()
     if autor_id == getattr(ch.solicitante, "id", None):
         if admin_emails:
             send_simple_email(subject, body, admin_emails)
@@ -120,26 +179,19 @@ def on_chamado_nova_mensagem(sender, instance: ChamadoMensagem, created: bool, *
                                   ref_app="solicitacoes", ref_model="Chamado", ref_pk=ch.id)
 
 # 3) MUDANÇA DE STATUS -> e-mail + sininho para solicitante
-@receiver(pre_save, sender=Chamado)
-def _capture_old_status(sender, instance: Chamado, **kwargs):
-    if not instance.pk:
-        return
-    try:
-        old = sender.objects.only("status").get(pk=instance.pk)
-        instance.__old_status = old.status
-    except sender.DoesNotExist:
-        pass
-
+# status anterior vem do snapshot do próprio Chamado (estado_anterior), sem SELECT no pre_save
 @receiver(post_save, sender=Chamado)
-def on_chamado_status_changed(sender, instance: Chamado, created: bool, **kwargs):
+def on_chamado_status_changed(sender, instance: Chamado, created: bool, update_fields=None, **kwargs):
     if created:
         return
 
-    old_status = getattr(instance, "__old_status", None)
-    new_status = instance.status
+    old_status = getattr(instance, "estado_anterior", {}).get("status")
+    new_status = instance.estado_salvo(update_fields).get("status")
     if old_status is None or old_status == new_status:
         return
 
+    publish_on_commit(DASHBOARD_TOPIC, "dashboard")
+
     subject = f"[Enprodes] Seu chamado #{instance.id} mudou de status"
     body = (
         f"O status do seu chamado #{instance.id} foi alterado.\n"
@@ -1,3 +1,126 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core import mail
+from django.core.management import call_command
+
+from core.testing import BaseTestCase
+from solicitacoes.models import Chamado, TipoSolicitacao
+
+from .models import Notification, NotificationCounter, NotificationOptOut
+from .pubsub import DASHBOARD_TOPIC
+from .services import (
+    dispatch_pending_emails,
+    drop_unread,
+    filter_opted_out,
+    send_email_batch,
+    unread_count,
+)
+from .signals import _notify_web_by_emails
+from .utils import adminish_emails
+
+
+class NotificacoesTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tipo = TipoSolicitacao.objects.create(nome="Férias")
+
+
+class ChamadoCriadoTests(NotificacoesTestCase):
+    def test_evento_do_dashboard_sem_dados_do_chamado(self):
+        broker = mock.Mock()
+        with mock.patch("notifications.pubsub.get_broker", return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                chamado = Chamado.objects.create(solicitante=self.user, tipo=self.tipo)
+            with self.captureOnCommitCallbacks(execute=True):
+                chamado.status = Chamado.Status.EM_ANDAMENTO
+                chamado.save()
+        dashboard = [c.args for c in broker.publish.call_args_list if c.args[0] == DASHBOARD_TOPIC]
+        self.assertEqual(dashboard, [(DASHBOARD_TOPIC, "dashboard", None)] * 2)
+
+    def test_falha_na_notificacao_nao_derruba_a_abertura(self):
+        with mock.patch("notifications.signals._notificar_chamado_criado", side_effect=RuntimeError("smtp")):
+            with self.assertLogs(level="ERROR"):  # robust: falha só é logada
+                with self.captureOnCommitCallbacks(execute=True):
+                    chamado = Chamado.objects.create(solicitante=self.user, tipo=self.tipo)
+        self.assertTrue(Chamado.objects.filter(pk=chamado.pk).exists())
+
+
+class CachesTests(NotificacoesTestCase):
+    def test_adminish_invalidado_ao_entrar_no_grupo(self):
+        self.assertNotIn("ana@enprodes.com.br", adminish_emails())
+        with self.assertNumQueries(0):
+            adminish_emails()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(Group.objects.get_or_create(name="Suporte")[0])
+        self.assertIn("ana@enprodes.com.br", adminish_emails())
+
+    def test_optout_invalidado_ao_gravar(self):
+        destinos = ["ana@enprodes.com.br", "bia@enprodes.com.br"]
+        self.assertEqual(filter_opted_out(destinos, "chamado_criado"), destinos)
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationOptOut.objects.create(email="Bia@enprodes.com.br", kind="")
+        self.assertEqual(filter_opted_out(destinos, "chamado_criado"), ["ana@enprodes.com.br"])
+
+    def test_optout_removido_volta_a_receber(self):
+        optout = NotificationOptOut.objects.create(email="bia@enprodes.com.br", kind="chamado_criado")
+        self.assertEqual(filter_opted_out(["bia@enprodes.com.br"], "chamado_criado"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            optout.delete()
+        self.assertEqual(filter_opted_out(["bia@enprodes.com.br"], "chamado_criado"), ["bia@enprodes.com.br"])
+
+
+class OutboxTests(NotificacoesTestCase):
+    def _enfileirar(self, destinos):
+        return send_email_batch("generic", destinos, {"subject": "Oi", "body": "Corpo"})
+
+    def test_envia_o_lote(self):
+        self._enfileirar(["ana@enprodes.com.br", "bia@enprodes.com.br"])
+        self.assertEqual(dispatch_pending_emails(), {"sent": 2, "failed": 0, "skipped": 0})
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["ana@enprodes.com.br", "bia@enprodes.com.br"])
+
+    def test_optout_depois_de_enfileirar_vale_no_envio(self):
+        self._enfileirar(["ana@enprodes.com.br", "bia@enprodes.com.br"])
+        filter_opted_out(["bia@enprodes.com.br"], "generic")  # cache aquecido sem o opt-out
+        # gravado por outro processo: o cache deste não é invalidado
+        NotificationOptOut.objects.bulk_create([NotificationOptOut(email="BIA@enprodes.com.br", kind="generic")])
+
+        self.assertEqual(dispatch_pending_emails(), {"sent": 1, "failed": 0, "skipped": 1})
+        self.assertEqual([m.to[0] for m in mail.outbox], ["ana@enprodes.com.br"])
+        pulado = Notification.objects.get(to_email="bia@enprodes.com.br")
+        self.assertFalse(pulado.is_sent)
+        self.assertEqual(dispatch_pending_emails(), {"sent": 0, "failed": 0, "skipped": 0})
+
+
+class ContadorNaoLidasTests(NotificacoesTestCase):
+    def _notificar(self, destinos):
+        _notify_web_by_emails(destinos, "Assunto", "Corpo", ref_app="solicitacoes", ref_model="Chamado", ref_pk=1)
+
+    def test_bump_e_drop(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._notificar(["Ana@enprodes.com.br", "bia@enprodes.com.br"])
+            self._notificar(["ana@enprodes.com.br"])
+        self.assertEqual(unread_count("ana@enprodes.com.br"), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            drop_unread("ana@enprodes.com.br", 5)
+        self.assertEqual(unread_count("ana@enprodes.com.br"), 0)
+
+    def test_reconstruir_corrige_divergencia(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._notificar(["ana@enprodes.com.br", "bia@enprodes.com.br"])
+            self._notificar(["ana@enprodes.com.br"])
+        unread_count("ana@enprodes.com.br")  # cache aquecido com o valor antigo
+        # delete em massa e contador órfão: nenhum passa por drop_unread
+        Notification.objects.filter(recipient="bia@enprodes.com.br").delete()
+        NotificationCounter.objects.create(email="cris@enprodes.com.br", unread=7)
+        Notification.objects.create(to_email="ana@enprodes.com.br", subject="s", channel=Notification.Channel.WEB)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("reconstruir_contadores", stdout=StringIO())
+        self.assertEqual(
+            dict(NotificationCounter.objects.values_list("email", "unread")),
+            {"ana@enprodes.com.br": 3},
+        )
+        self.assertEqual(unread_count("ana@enprodes.com.br"), 3)
+        self.assertEqual(unread_count("cris@enprodes.com.br"), 0)
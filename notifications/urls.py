@@ -7,5 +7,6 @@ urlpatterns = [
     path("count/", views.count_unread, name="count"),
     path("dropdown/", views.dropdown, name="dropdown"),
     path("mark-read/<int:pk>/", views.mark_read, name="mark_read"),
+    path("stream/", views.stream, name="stream"),
     path("", views.list_notifications, name="list"), 
 ]
@@ -1,9 +1,13 @@
 # notifications/utils.py
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db.models import Q
 
 User = get_user_model()
 
+ADMINISH_EMAILS_CACHE_KEY = "notifications:adminish_emails"
+
 def users_adminish():
     """
     Usuários que devem ver/receber notificações gerais de chamados.
@@ -33,6 +37,32 @@ def emails(users_qs):
             unique.append(e)
     return unique
 
+def adminish_emails():
+    """
+    E-mails (normalizados) dos usuários admin-ish, cacheados.
+    O cache é limpo pelos signals de User/Group (ver signals.py).
+    """
+    cached = cache.get(ADMINISH_EMAILS_CACHE_KEY)
+    if cached is not None:
+        return list(cached)
+    result = emails(users_adminish().only("email"))
+    cache.set(ADMINISH_EMAILS_CACHE_KEY, result, settings.CACHE_TTL_CURTO)
+    return list(result)
+
+def invalidate_adminish_emails():
+    cache.delete(ADMINISH_EMAILS_CACHE_KEY)
+
+def user_ids_by_email(to_emails):
+    """
+    {email_normalizado: user_id} para os destinatários, numa única query.
+    (User.email já é gravado em minúsculas pelo validate_company_email.)
+    """
+    norm = {(e or "").strip().lower() for e in (to_emails or [])}
+    norm.discard("")
+    if not norm:
+        return {}
+    return dict(User.objects.filter(email__in=norm).values_list("email", "id"))
+
 def get_atendente_user(chamado):
     """
     Se você tiver um FK (ex.: chamado.atendente), use-o aqui.
@@ -1,37 +1,120 @@
 # notifications/views.py
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
-from django.views.decorators.http import require_http_methods
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_http_methods
+
+from .models import Notification, normalize_recipient
+from .pubsub import STAFF_TOPIC, DASHBOARD_TOPIC, get_broker, user_topic
+from .services import drop_unread, unread_count
 
-from .models import Notification
+SSE_KEEPALIVE = 25  # segundos (evita timeout de proxy em conexões ociosas)
 
 def _user_email(request):
     return (request.user.email or "").strip()
 
+def _recipient(request):
+    return normalize_recipient(request.user.email)
+
 @login_required
 def list_notifications(request):
-    email = _user_email(request)
-    qs = Notification.objects.filter(to_email__iexact=email).order_by("-created_at") if email else Notification.objects.none()
+    recipient = _recipient(request)
+    qs = Notification.objects.filter(recipient=recipient).order_by("-created_at") if recipient else Notification.objects.none()
     return render(request, "notifications/list.html", {"notifications": qs})
 
+def _unread_etag(request):
+    return f'"unread-{unread_count(_user_email(request))}"'
+
 @login_required
+@condition(etag_func=_unread_etag)
 def count_unread(request):
-    email = _user_email(request)
-    count = Notification.objects.filter(to_email__iexact=email, channel="web").count() if email else 0
-    return JsonResponse({"count": count})
+    # responde do contador/cache; abas ociosas recebem 304 (If-None-Match)
+    resp = JsonResponse({"count": unread_count(_user_email(request))})
+    patch_cache_control(resp, private=True, no_cache=True)
+    return resp
 
 @login_required
 def dropdown(request):
-    email = _user_email(request)
-    qs = Notification.objects.filter(to_email__iexact=email, channel="web").order_by("-created_at")[:10] if email else Notification.objects.none()
+    recipient = _recipient(request)
+    # índice (recipient, channel, created_at): busca só as 10 últimas, sem varrer
+    qs = (
+        Notification.objects.filter(recipient=recipient, channel=Notification.Channel.WEB)
+        .order_by("-created_at")[:10]
+        if recipient else Notification.objects.none()
+    )
     return render(request, "notifications/_dropdown.html", {"notifications": qs})
 
 @login_required
 @require_http_methods(["GET", "POST"])
 def mark_read(request, pk: int):
     email = _user_email(request)
-    Notification.objects.filter(pk=pk, to_email__iexact=email).delete()
+    qs = Notification.objects.filter(pk=pk, recipient=normalize_recipient(email))
+    removed_web, _ = qs.filter(channel=Notification.Channel.WEB).delete()
+    if removed_web:
+        drop_unread(email, removed_web)
+    else:
+        qs.delete()
     if request.headers.get("HX-Request") or request.headers.get("X-Requested-With") == "XMLHttpRequest":
         return JsonResponse({"ok": True})
     return redirect(request.META.get("HTTP_REFERER", "/"))
+
+
+# --- Push (Server-Sent Events) ---
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _stream_topics(user):
+    from solicitacoes.views import _is_adminish
+
+    topics = [user_topic(user.email), DASHBOARD_TOPIC]
+    if _is_adminish(user):
+        topics.append(STAFF_TOPIC)
+    return topics
+
+async def _event_stream(user):
+    topics = await sync_to_async(_stream_topics)(user)
+    sub = get_broker().subscribe(topics)
+    try:
+        yield "retry: 5000\n\n"
+        count = await sync_to_async(unread_count)(user.email)
+        yield _sse_event("notif_count", {"count": count})
+        while True:
+            try:
+                msg = await asyncio.wait_for(sub.get(), timeout=SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            event, data = msg["event"], msg["data"]
+            if event == "notifications":
+                count = await sync_to_async(unread_count)(user.email)
+                yield _sse_event("notif_count", {"count": count})
+            elif event == "nova_mensagem" and data.get("autor") == user.pk:
+                continue
+            else:
+                yield _sse_event(event, data)
+    finally:
+        sub.close()
+
+@login_required
+async def stream(request):
+    """
+    GET /notifications/stream/ (EventSource)
+    Eventos: notif_count, nova_mensagem, dashboard. Os endpoints de poll
+    continuam existindo como fallback quando o push não está disponível.
+    """
+    if not isinstance(request, ASGIRequest):
+        # sob WSGI uma conexão longa prenderia um worker: 204 => EventSource
+        # não reconecta e a página segue no poll
+        return HttpResponse(status=204)
+    user = await request.auser()
+    resp = StreamingHttpResponse(_event_stream(user), content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"
+    return resp
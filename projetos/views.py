@@ -5,6 +5,7 @@ from django.http import JsonResponse, HttpResponseForbidden
 from django.views.decorators.http import require_POST
 from .forms import CostCenterCreateForm
 from collections import OrderedDict
+from accounts.principal import get_principal
 
 
 
@@ -17,11 +18,8 @@ def _is_gestor(user) -> bool:
         return False
     if user.is_superuser:
         return True
-    return CostCenterMember.objects.filter(
-        usuario=user,
-        papel=CostCenterMember.Role.GESTOR,
-        ativo=True
-    ).exists()
+    # centros onde é GESTOR ativo (principal cacheado, ver accounts/principal.py)
+    return get_principal(user).eh_gestor_de_centro
 
 
 @login_required
@@ -99,12 +97,7 @@ def board(request, centro_id):
 
     # Segurança extra: se não for superuser, precisa ser Gestor *deste* centro
     if not request.user.is_superuser:
-        autorizado = CostCenterMember.objects.filter(
-            centro=centro,
-            usuario=request.user,
-            papel=CostCenterMember.Role.GESTOR,
-            ativo=True,
-        ).exists()
+        autorizado = centro.pk in get_principal(request.user).centros_gestor
         if not autorizado:
             return HttpResponseForbidden("Você não tem permissão neste centro.")
 
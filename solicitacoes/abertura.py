@@ -0,0 +1,95 @@
+# solicitacoes/abertura.py
+"""
+Abertura de chamado (nova_solicitacao) em lote:
+  1) respostas validadas contra o schema compilado do tipo (cache), antes de
+     qualquer escrita — nada de query por pergunta;
+  2) Chamado + todas as respostas numa transação curta (1 bulk_create);
+  3) anexos salvos no storage dentro do próprio request, antes da resposta de
+     sucesso; se um falhar, os já gravados são removidos, nada é criado e o
+     usuário vê o erro.
+As notificações do novo chamado também saem no on_commit (notifications/signals.py).
+"""
+import logging
+from typing import List, NamedTuple, Optional
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+
+from .models import Chamado, PerguntaTipoSolicitacao, RespostaChamado
+from .schema import SchemaTipo
+
+logger = logging.getLogger(__name__)
+
+
+class RespostaNova(NamedTuple):
+    pergunta_id: int
+    valor_texto: str
+    arquivo: Optional[UploadedFile]
+
+
+def coletar_respostas(schema: SchemaTipo, post, files) -> List[RespostaNova]:
+    """Lê e valida as respostas do POST; ValidationError na primeira obrigatória vazia."""
+    TipoCampo = PerguntaTipoSolicitacao.TipoCampo
+    respostas = []
+    for p in schema.perguntas_ativas:
+        nome_base = f"pergunta_{p.id}"
+        if p.tipo_campo == TipoCampo.MULTIESCOLHA:
+            valores = post.getlist(nome_base)
+            valor_texto = ";".join(v.strip() for v in valores if v.strip())
+        elif p.tipo_campo == TipoCampo.BOOLEANO:
+            valor_texto = "true" if post.get(nome_base) == "true" else "false"
+        else:
+            valor_texto = (post.get(nome_base, "") or "").strip()
+
+        arquivo = None
+        if p.tipo_campo == TipoCampo.ARQUIVO:
+            arquivo = files.get(nome_base + "_file")
+
+        if p.obrigatoria and p.tipo_campo != TipoCampo.ARQUIVO and not valor_texto:
+            raise ValidationError(f'A pergunta "{p.texto}" é obrigatória.')
+
+        respostas.append(RespostaNova(p.id, valor_texto, arquivo))
+    return respostas
+
+
+def _remover_arquivos(objs):
+    for obj in objs:
+        obj.valor_arquivo.storage.delete(obj.valor_arquivo.name)
+
+
+def _montar_respostas(chamado, respostas: List[RespostaNova]) -> List[RespostaChamado]:
+    """
+    Monta as RespostaChamado do chamado, já com os uploads salvos no storage.
+    Se algum upload falhar, remove os arquivos já gravados e levanta
+    ValidationError (a transação de abrir_chamado desfaz o chamado).
+    """
+    objs, salvos = [], []
+    for r in respostas:
+        obj = RespostaChamado(chamado=chamado, pergunta_id=r.pergunta_id, valor_texto=r.valor_texto)
+        if r.arquivo is not None:
+            try:
+                obj.valor_arquivo.save(r.arquivo.name, r.arquivo, save=False)
+            except Exception:
+                logger.exception("Falha ao gravar anexo da pergunta %s no chamado #%s", r.pergunta_id, chamado.pk)
+                _remover_arquivos(salvos)
+                raise ValidationError(f'Não foi possível salvar o anexo "{r.arquivo.name}". Tente novamente.')
+            salvos.append(obj)
+        objs.append(obj)
+    return objs
+
+
+def abrir_chamado(user, tipo, respostas: List[RespostaNova]) -> Chamado:
+    """
+    Cria o chamado e suas respostas (tudo-ou-nada), com os anexos já no
+    storage; ValidationError se um anexo não puder ser salvo.
+    """
+    with transaction.atomic():
+        chamado = Chamado.objects.create(solicitante=user, tipo=tipo, status=Chamado.Status.ABERTO)
+        objs = _montar_respostas(chamado, respostas)
+        try:
+            RespostaChamado.objects.bulk_create(objs)
+        except Exception:
+            _remover_arquivos([o for o in objs if o.valor_arquivo])
+            raise
+    return chamado
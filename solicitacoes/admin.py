@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import TipoSolicitacao, PerguntaTipoSolicitacao, Chamado, RespostaChamado
+from .models import (
+    TipoSolicitacao, PerguntaTipoSolicitacao, Chamado, RespostaChamado, ExportacaoRelatorio,
+    ChamadoTransicao, ChamadoSla,
+)
 
 
 class PerguntaInline(admin.TabularInline):
@@ -28,3 +31,30 @@ class ChamadoAdmin(admin.ModelAdmin):
 class RespostaChamadoAdmin(admin.ModelAdmin):
     list_display = ('chamado', 'pergunta', 'valor_texto', 'valor_arquivo')
     search_fields = ('valor_texto', 'pergunta__texto', 'chamado__id')
+
+
+@admin.register(ExportacaoRelatorio)
+class ExportacaoRelatorioAdmin(admin.ModelAdmin):
+    list_display = ('id', 'formato', 'status', 'processadas', 'total', 'solicitado_por', 'criado_em', 'concluido_em')
+    list_filter = ('status', 'formato')
+    readonly_fields = ('chave',)
+
+
+@admin.register(ChamadoTransicao)
+class ChamadoTransicaoAdmin(admin.ModelAdmin):
+    # log append-only: só leitura
+    list_display = ('chamado', 'de', 'para', 'em', 'autor_nome')
+    list_filter = ('para',)
+    search_fields = ('chamado__id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ChamadoSla)
+class ChamadoSlaAdmin(admin.ModelAdmin):
+    list_display = ('chamado', 'tempo_primeira_atribuicao', 'tempo_suspenso', 'suspensoes', 'tempo_conclusao', 'transicoes')
+    search_fields = ('chamado__id',)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SolicitacoesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'solicitacoes'
+
+    def ready(self):
+        # rollup do dashboard (solicitacoes/signals.py)
+        from . import signals  # noqa: F401
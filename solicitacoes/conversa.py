@@ -0,0 +1,100 @@
+# solicitacoes/conversa.py
+"""
+Leitura incremental da conversa (ChamadoMensagem) por cursor keyset.
+
+O cursor é a chave (criado_em, id) da mensagem de borda, em texto
+"<microssegundos desde epoch>-<id>" (seguro para querystring). As consultas
+filtram chamado + criado_em e ordenam por (criado_em, id), usando o índice
+(chamado, criado_em):
+  - depois do cursor: só as mensagens novas (refresh / após enviar)
+  - antes do cursor: páginas mais antigas (rolagem para cima)
+O modal do relatório usa a mesma janela (últimas RELATORIO_MENSAGENS) e pode
+compactar eventos de sistema consecutivos (timeline_compacta).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+
+from .models import ChamadoMensagem
+
+MENSAGENS_POR_PAGINA = 50
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def mensagens_visiveis(chamado, is_admin: bool):
+    """Mensagens do chamado que o usuário pode ver (internas só para admin-ish)."""
+    qs = ChamadoMensagem.objects.filter(chamado=chamado).select_related("autor")
+    if not is_admin:
+        qs = qs.filter(visibilidade=ChamadoMensagem.PUBLICA)
+    return qs
+
+
+def cursor_mensagem(msg) -> str:
+    if msg is None:
+        return ""
+    delta = msg.criado_em - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{micros}-{msg.pk}"
+
+
+def ler_cursor(valor):
+    """(criado_em, id) do cursor, ou None se vazio/inválido."""
+    micros, sep, pk = (valor or "").strip().partition("-")
+    if not sep:
+        return None
+    try:
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (ValueError, OverflowError):
+        return None
+
+
+def mensagens_depois(qs, cursor, limite: int = MENSAGENS_POR_PAGINA):
+    """Até 'limite' mensagens posteriores ao cursor, em ordem cronológica."""
+    criado_em, pk = cursor
+    qs = qs.filter(criado_em__gte=criado_em).filter(Q(criado_em__gt=criado_em) | Q(pk__gt=pk))
+    return list(qs.order_by("criado_em", "id")[:limite])
+
+
+def mensagens_antes(qs, cursor=None, limite: int = MENSAGENS_POR_PAGINA):
+    """
+    Página de 'limite' mensagens anteriores ao cursor (sem cursor: as últimas),
+    em ordem cronológica. Retorna (mensagens, tem_mais).
+    """
+    if cursor is not None:
+        criado_em, pk = cursor
+        qs = qs.filter(criado_em__lte=criado_em).filter(Q(criado_em__lt=criado_em) | Q(pk__lt=pk))
+    pagina = list(qs.order_by("-criado_em", "-id")[:limite + 1])
+    tem_mais = len(pagina) > limite
+    return pagina[:limite][::-1], tem_mais
+
+
+# --- Linha do tempo do modal do relatório ---
+
+RELATORIO_MENSAGENS = 30
+EVENTO_MENSAGEM = "mensagem"  # demais tipo_evento (status, atualizacao, sistema) são eventos
+
+
+def timeline_compacta(mensagens):
+    """
+    Agrupa eventos de sistema consecutivos num único item, para o modal não
+    crescer com o histórico de status/atualizações. Itens:
+      {"mensagem": m}                                    -> mensagem (ou evento isolado)
+      {"eventos": n, "primeiro": m0, "ultimo": mN}       -> n eventos seguidos
+    """
+    itens, grupo = [], []
+
+    def _fechar():
+        if len(grupo) == 1:
+            itens.append({"mensagem": grupo[0]})
+        elif grupo:
+            itens.append({"eventos": len(grupo), "primeiro": grupo[0], "ultimo": grupo[-1]})
+        grupo.clear()
+
+    for m in mensagens:
+        if (m.tipo_evento or EVENTO_MENSAGEM) == EVENTO_MENSAGEM:
+            _fechar()
+            itens.append({"mensagem": m})
+        else:
+            grupo.append(m)
+    _fechar()
+    return itens
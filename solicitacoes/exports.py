@@ -0,0 +1,298 @@
+# solicitacoes/exports.py
+"""
+Exportação do relatório de solicitações sem montar tudo em memória:
+  - linhas lidas com values_list + iterator(chunk_size) (sem instanciar Chamado/User)
+  - CSV: gerador para StreamingHttpResponse (primeiro byte sai na hora)
+  - XLSX: openpyxl write-only, gravado em arquivo temporário e servido em blocos
+  - jobs (ExportacaoRelatorio): o mesmo pipeline rodando no worker, com
+    progresso e o arquivo salvo no storage de mídia
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import tempfile
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Chamado, ExportacaoRelatorio, PerguntaTipoSolicitacao, RespostaChamado
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK = 2000
+CABECALHO = ["ID", "Solicitante", "Tipo", "Status", "Criado em"]
+FILTROS_RELATORIO = ("q", "tipo", "status", "de", "ate")
+
+# jobs em segundo plano
+EXPORT_REUSO = timedelta(minutes=10)   # pedidos idênticos nessa janela reaproveitam o arquivo
+EXPORT_LEASE = timedelta(minutes=30)   # job "processando" além disso é considerado abandonado
+
+
+def filtros_relatorio(params) -> dict:
+    """Filtros do relatório a partir de request.GET (ou de um dict salvo)."""
+    return {k: (params.get(k) or "").strip() for k in FILTROS_RELATORIO}
+
+
+def _parse_d(dstr):
+    try:
+        return date.fromisoformat(dstr)
+    except Exception:
+        return None
+
+
+def relatorio_queryset(filtros: dict):
+    """Chamados do relatório com os filtros aplicados (tela, export e jobs)."""
+    qs = (
+        Chamado.objects
+        .select_related("tipo", "solicitante")
+        .order_by("-criado_em")
+    )
+    q = filtros.get("q") or ""            # ID ou solicitante
+    tipo = filtros.get("tipo") or ""      # tipo_id
+    status = filtros.get("status") or ""  # código do status
+
+    # q: número -> ID; texto -> campos do solicitante
+    if q:
+        if q.isdigit():
+            qs = qs.filter(id=int(q))
+        else:
+            UserModel = get_user_model()
+            user_fields = {f.name for f in UserModel._meta.get_fields() if hasattr(f, "name")}
+            qf = (
+                Q(solicitante__username__icontains=q) |
+                Q(solicitante__first_name__icontains=q) |
+                Q(solicitante__last_name__icontains=q)
+            )
+            if "nome_completo" in user_fields:
+                qf |= Q(solicitante__nome_completo__icontains=q)
+            qs = qs.filter(qf)
+
+    if tipo:
+        qs = qs.filter(tipo_id=tipo)
+
+    if status:
+        qs = qs.filter(status=status)
+
+    # período por data de criação (YYYY-MM-DD)
+    d_de = _parse_d(filtros.get("de") or "")
+    d_ate = _parse_d(filtros.get("ate") or "")
+    if d_de:
+        qs = qs.filter(criado_em__date__gte=d_de)
+    if d_ate:
+        qs = qs.filter(criado_em__date__lte=d_ate)
+    return qs
+
+
+def linhas_relatorio(qs, chunk_size: int = EXPORT_CHUNK):
+    """Linhas do relatório (mesmas colunas de CABECALHO), em streaming."""
+    status_label = dict(Chamado.Status.choices)
+    rows = (
+        qs.order_by("-criado_em", "-id")
+        .values_list("id", "solicitante__nome_completo", "solicitante__cpf", "tipo__nome", "status", "criado_em")
+        .iterator(chunk_size=chunk_size)
+    )
+    for pk, nome, cpf, tipo_nome, status, criado_em in rows:
+        yield [
+            pk,
+            f"{nome} ({cpf})",  # mesmo formato de User.__str__
+            tipo_nome or "",
+            status_label.get(status, status),
+            criado_em.strftime("%d/%m/%Y %H:%M") if criado_em else "",
+        ]
+
+
+def perguntas_do_relatorio(qs):
+    """Perguntas dos tipos presentes em 'qs', na ordem das colunas (tipo, ordem)."""
+    return list(
+        PerguntaTipoSolicitacao.objects
+        .filter(tipo_id__in=qs.order_by().values("tipo_id"))
+        .select_related("tipo")
+        .order_by("tipo__nome", "ordem", "id")
+    )
+
+
+def linhas_com_respostas(qs, perguntas, chunk_size: int = EXPORT_CHUNK):
+    """
+    linhas_relatorio + uma coluna por pergunta (pivot de RespostaChamado).
+    As respostas vêm em lote: 1 query por bloco de chunk_size chamados.
+    """
+    coluna = {p.pk: i for i, p in enumerate(perguntas)}
+
+    def _bloco(linhas):
+        por_chamado = defaultdict(dict)
+        respostas = (
+            RespostaChamado.objects
+            .filter(chamado_id__in=[linha[0] for linha in linhas], pergunta_id__in=coluna.keys())
+            .order_by()
+            .values_list("chamado_id", "pergunta_id", "valor_texto", "valor_arquivo")
+        )
+        for chamado_id, pergunta_id, texto, arquivo in respostas:
+            por_chamado[chamado_id][coluna[pergunta_id]] = texto or arquivo or ""
+        for linha in linhas:
+            extras = [""] * len(perguntas)
+            for i, valor in por_chamado.get(linha[0], {}).items():
+                extras[i] = valor
+            yield linha + extras
+
+    bloco = []
+    for linha in linhas_relatorio(qs, chunk_size):
+        bloco.append(linha)
+        if len(bloco) >= chunk_size:
+            yield from _bloco(bloco)
+            bloco = []
+    if bloco:
+        yield from _bloco(bloco)
+
+
+def dados_exportacao(qs, com_respostas: bool = False, chunk_size: int = EXPORT_CHUNK):
+    """(cabeçalho, linhas) do export; com_respostas pivota as perguntas em colunas."""
+    if not com_respostas:
+        return CABECALHO, linhas_relatorio(qs, chunk_size)
+    perguntas = perguntas_do_relatorio(qs)
+    cabecalho = CABECALHO + [f"{p.tipo.nome}: {p.texto}" for p in perguntas]
+    return cabecalho, linhas_com_respostas(qs, perguntas, chunk_size)
+
+
+def csv_stream(cabecalho, linhas, linhas_por_bloco: int = 500):
+    """Gera o CSV em blocos de texto (';' + BOM para abrir direto no Excel)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    buf.write("﻿")
+    writer.writerow(cabecalho)
+    for i, linha in enumerate(linhas, 1):
+        writer.writerow(linha)
+        if i % linhas_por_bloco == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def escrever_xlsx(destino, cabecalho, linhas, titulo: str = "Solicitações"):
+    """Grava o XLSX em 'destino' (caminho ou arquivo) com openpyxl write-only."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(titulo)
+    ws.append(cabecalho)
+    for linha in linhas:
+        ws.append(linha)
+    wb.save(destino)
+
+
+def xlsx_temporario(cabecalho, linhas, titulo: str = "Solicitações"):
+    """XLSX num arquivo temporário (apagado ao fechar), pronto para FileResponse."""
+    tmp = tempfile.TemporaryFile(suffix=".xlsx")
+    escrever_xlsx(tmp, cabecalho, linhas, titulo)
+    tmp.seek(0)
+    return tmp
+
+
+# --- Jobs em segundo plano (ExportacaoRelatorio) ---
+
+def _chave_exportacao(formato: str, filtros: dict, com_respostas: bool) -> str:
+    payload = json.dumps({"formato": formato, "filtros": filtros, "respostas": com_respostas}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def solicitar_exportacao(user, filtros: dict, formato: str, com_respostas: bool = False) -> ExportacaoRelatorio:
+    """
+    Registra o job (o worker gera o arquivo). Se o mesmo pedido (formato+filtros)
+    foi feito dentro de EXPORT_REUSO e não falhou, devolve esse job/arquivo.
+    """
+    chave = _chave_exportacao(formato, filtros, com_respostas)
+    existente = (
+        ExportacaoRelatorio.objects
+        .filter(chave=chave, criado_em__gte=timezone.now() - EXPORT_REUSO)
+        .exclude(status=ExportacaoRelatorio.Status.ERRO)
+        .order_by("-criado_em")
+        .first()
+    )
+    if existente is not None:
+        return existente
+    return ExportacaoRelatorio.objects.create(
+        solicitado_por=user, formato=formato, filtros=filtros, com_respostas=com_respostas, chave=chave,
+    )
+
+
+def _reservar_proxima():
+    """Pega o próximo job pendente (ou abandonado) sem disputar com outro worker."""
+    agora = timezone.now()
+    S = ExportacaoRelatorio.Status
+    with transaction.atomic():
+        job = (
+            ExportacaoRelatorio.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=S.PENDENTE)
+                | Q(status=S.PROCESSANDO, iniciado_em__lt=agora - EXPORT_LEASE)
+            )
+            .order_by("criado_em", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = S.PROCESSANDO
+        job.iniciado_em = agora
+        job.processadas = 0
+        job.save(update_fields=["status", "iniciado_em", "processadas"])
+    return job
+
+
+def _com_progresso(job, linhas, a_cada: int):
+    """Repassa as linhas atualizando job.processadas a cada bloco."""
+    n = 0
+    for n, linha in enumerate(linhas, 1):
+        yield linha
+        if n % a_cada == 0:
+            ExportacaoRelatorio.objects.filter(pk=job.pk).update(processadas=n)
+    job.processadas = n
+
+
+def gerar_exportacao(job, chunk_size: int = EXPORT_CHUNK):
+    """Gera o arquivo do job em blocos (arquivo temporário) e salva no storage."""
+    qs = relatorio_queryset(job.filtros or {})
+    job.total = qs.count()
+    job.save(update_fields=["total"])
+
+    cabecalho, linhas = dados_exportacao(qs, job.com_respostas, chunk_size)
+    linhas = _com_progresso(job, linhas, chunk_size)
+    with tempfile.TemporaryFile() as tmp:
+        if job.formato == ExportacaoRelatorio.Formato.CSV:
+            for bloco in csv_stream(cabecalho, linhas):
+                tmp.write(bloco.encode("utf-8"))
+        else:
+            escrever_xlsx(tmp, cabecalho, linhas)
+        tmp.seek(0)
+        nome = f"relatorio-solicitacoes-{job.pk}.{job.formato}"
+        job.arquivo.save(nome, File(tmp), save=False)
+
+    job.status = ExportacaoRelatorio.Status.CONCLUIDO
+    job.concluido_em = timezone.now()
+    job.save(update_fields=["arquivo", "status", "processadas", "concluido_em"])
+
+
+def processar_exportacoes(max_jobs: int = 10) -> int:
+    """Processa até max_jobs jobs; retorna quantos foram processados."""
+    feitos = 0
+    while feitos < max_jobs:
+        job = _reservar_proxima()
+        if job is None:
+            break
+        try:
+            gerar_exportacao(job)
+        except Exception as exc:
+            logger.exception("Falha na exportação #%s", job.pk)
+            job.status = ExportacaoRelatorio.Status.ERRO
+            job.erro = str(exc)[:2000]
+            job.concluido_em = timezone.now()
+            job.save(update_fields=["status", "erro", "concluido_em"])
+        feitos += 1
+    return feitos
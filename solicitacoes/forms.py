@@ -1,6 +1,7 @@
 from django import forms
 from .models import TipoSolicitacao, PerguntaTipoSolicitacao
 from .models import ChamadoMensagem
+from .visibilidade import tipos_visiveis_ids
 
 
 class TipoSolicitacaoForm(forms.ModelForm):
@@ -35,9 +36,8 @@ class NovaSolicitacaoTipoForm(forms.Form):
         super().__init__(*args, **kwargs)
         qs = TipoSolicitacao.objects.filter(ativo=True)
         if user is not None:
-            # usa o helper visivel_para(user)
-            allowed_ids = [t.id for t in qs if t.visivel_para(user)]
-            qs = qs.filter(pk__in=allowed_ids)
+            # índice setor -> tipos em cache (mesma regra de visivel_para)
+            qs = qs.filter(pk__in=tipos_visiveis_ids(user))
         self.fields['tipo'].queryset = qs.order_by('nome')
 
 
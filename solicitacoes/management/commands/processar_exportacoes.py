@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from solicitacoes.exports import processar_exportacoes
+
+
+class Command(BaseCommand):
+    help = "Worker das exportações do relatório: gera os arquivos dos jobs pendentes (ExportacaoRelatorio)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Processa a fila uma vez e sai (útil em cron).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Segundos entre verificações quando a fila está vazia (padrão: 5).",
+        )
+
+    def handle(self, *args, **options):
+        once = options["once"]
+        interval = max(0.5, options["interval"])
+
+        self.stdout.write(self.style.NOTICE("Worker de exportações iniciado."))
+        try:
+            while True:
+                feitos = processar_exportacoes()
+                if feitos:
+                    self.stdout.write(f"{feitos} exportação(ões) processada(s).")
+                    continue
+                if once:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Worker de exportações finalizado."))
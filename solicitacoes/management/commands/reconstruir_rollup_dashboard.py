@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from solicitacoes.rollups import reconstruir_rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula do zero o rollup do dashboard (ChamadoRollup) a partir dos chamados. "
+        "Use após cargas/updates em massa que não disparam signals."
+    )
+
+    def handle(self, *args, **options):
+        total = reconstruir_rollup()
+        self.stdout.write(self.style.SUCCESS(f"Rollup reconstruído: {total} linha(s)."))
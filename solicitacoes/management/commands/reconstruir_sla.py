@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from solicitacoes.sla import reconstruir_sla
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula as métricas de SLA (ChamadoSla) a partir do histórico de status "
+        "(ChamadoTransicao). Use após correções manuais no histórico."
+    )
+
+    def handle(self, *args, **options):
+        total = reconstruir_sla()
+        self.stdout.write(self.style.SUCCESS(f"SLA recalculado: {total} chamado(s)."))
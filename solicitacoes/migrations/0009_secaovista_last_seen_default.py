@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitacoes', '0008_chamadovista_alter_respostachamado_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='secaovista',
+            name='last_seen',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rollup(apps, schema_editor):
+    Chamado = apps.get_model("solicitacoes", "Chamado")
+    ChamadoRollup = apps.get_model("solicitacoes", "ChamadoRollup")
+    rows = (
+        Chamado.objects.order_by()
+        .values("solicitante_id", "tipo_id", "status")
+        .annotate(qtd=Count("id"))
+    )
+    ChamadoRollup.objects.bulk_create([ChamadoRollup(**r) for r in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitacoes', '0009_secaovista_last_seen_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChamadoRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('aberto', 'Aberto'), ('em_andamento', 'Em andamento'), ('concluido', 'Concluído'), ('suspenso', 'Suspenso'), ('cancelado', 'Cancelado')], max_length=20)),
+                ('qtd', models.IntegerField(default=0)),
+                ('solicitante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('tipo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='solicitacoes.tiposolicitacao')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('solicitante', 'tipo', 'status'), name='uq_rollup_sol_tipo_status')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
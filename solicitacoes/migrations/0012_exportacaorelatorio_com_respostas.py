@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitacoes', '0011_exportacaorelatorio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportacaorelatorio',
+            name='com_respostas',
+            field=models.BooleanField(default=False),
+        ),
+    ]
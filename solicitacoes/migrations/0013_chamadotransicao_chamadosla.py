@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:40
+
+import datetime
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def criar_sla_existentes(apps, schema_editor):
+    # chamados anteriores ao histórico: sem transições conhecidas, só a linha de SLA
+    # (suspensão em curso passa a ser medida a partir de suspenso_em)
+    Chamado = apps.get_model("solicitacoes", "Chamado")
+    ChamadoSla = apps.get_model("solicitacoes", "ChamadoSla")
+    rows = Chamado.objects.values_list("pk", "status", "suspenso_em").iterator(chunk_size=1000)
+    ChamadoSla.objects.bulk_create(
+        (
+            ChamadoSla(chamado_id=pk, suspenso_desde=suspenso_em if status == "suspenso" else None)
+            for pk, status, suspenso_em in rows
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitacoes', '0012_exportacaorelatorio_com_respostas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChamadoSla',
+            fields=[
+                ('chamado', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sla', serialize=False, to='solicitacoes.chamado')),
+                ('primeira_atribuicao_em', models.DateTimeField(blank=True, null=True)),
+                ('tempo_primeira_atribuicao', models.DurationField(blank=True, null=True)),
+                ('suspenso_desde', models.DateTimeField(blank=True, null=True)),
+                ('tempo_suspenso', models.DurationField(default=datetime.timedelta(0))),
+                ('suspensoes', models.PositiveIntegerField(default=0)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('tempo_conclusao', models.DurationField(blank=True, null=True)),
+                ('transicoes', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChamadoTransicao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('de', models.CharField(blank=True, choices=[('aberto', 'Aberto'), ('em_andamento', 'Em andamento'), ('concluido', 'Concluído'), ('suspenso', 'Suspenso'), ('cancelado', 'Cancelado')], max_length=20)),
+                ('para', models.CharField(choices=[('aberto', 'Aberto'), ('em_andamento', 'Em andamento'), ('concluido', 'Concluído'), ('suspenso', 'Suspenso'), ('cancelado', 'Cancelado')], max_length=20)),
+                ('em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('autor_nome', models.CharField(blank=True, max_length=120)),
+                ('chamado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transicoes', to='solicitacoes.chamado')),
+            ],
+            options={
+                'ordering': ['em', 'id'],
+                'indexes': [models.Index(fields=['chamado', 'em'], name='solicitacoe_chamado_d8f047_idx')],
+            },
+        ),
+        migrations.RunPython(criar_sla_existentes, migrations.RunPython.noop),
+    ]
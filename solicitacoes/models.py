@@ -131,6 +131,45 @@ class Chamado(models.Model):
     def __str__(self) -> str:
         return f"#{self.pk} - {self.tipo.nome} - {self.get_status_display()}"
 
+    # ---------- Estado como veio do banco ----------
+    # Os signals (rollup do dashboard, mudança de status) comparam com este
+    # snapshot em vez de fazer um SELECT extra no pre_save.
+    CAMPOS_RASTREADOS = ("status", "tipo_id", "solicitante_id")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        obj = super().from_db(db, field_names, values)
+        obj._estado_db = {f: obj.__dict__[f] for f in cls.CAMPOS_RASTREADOS if f in obj.__dict__}
+        return obj
+
+    def _ler_estado_anterior(self) -> dict:
+        if self._state.adding or not self.pk:
+            return {}
+        estado = dict(getattr(self, "_estado_db", {}))
+        faltando = [f for f in self.CAMPOS_RASTREADOS if f not in estado]
+        if faltando:
+            # campos adiados (.only/.defer): busca só o que falta
+            row = type(self).objects.filter(pk=self.pk).values(*faltando).first() or {}
+            estado.update(row)
+        return estado
+
+    def estado_salvo(self, update_fields=None) -> dict:
+        """Estado de CAMPOS_RASTREADOS no banco após um save com 'update_fields'."""
+        estado = dict(getattr(self, "estado_anterior", {}))
+        for f in self.CAMPOS_RASTREADOS:
+            nome = f[:-3] if f.endswith("_id") else f
+            if update_fields is None or nome in update_fields or f in update_fields:
+                if f in self.__dict__:
+                    estado[f] = self.__dict__[f]
+        return estado
+
+    def save(self, *args, **kwargs):
+        # estado antes deste save ({} se novo); lido pelos receivers de post_save
+        self.estado_anterior = self._ler_estado_anterior()
+        super().save(*args, **kwargs)
+        # post_save já rodou; agora o snapshot passa a ser o estado atual
+        self._estado_db = self.estado_salvo(kwargs.get("update_fields"))
+
     # ---------- Helpers de fluxo ----------
     def suspender(self):
         self.status = self.Status.SUSPENSO
@@ -171,6 +210,133 @@ class Chamado(models.Model):
         return self.respostas.filter(valor_arquivo__isnull=False).exists()
 
 
+# =========================
+# Rollup do dashboard
+# =========================
+
+class ChamadoRollup(models.Model):
+    """
+    Contagem materializada de chamados por (solicitante, tipo, status).
+    Mantida pelos signals de Chamado (solicitacoes/signals.py); o comando
+    'reconstruir_rollup_dashboard' recalcula do zero se houver divergência.
+    """
+    solicitante = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    tipo = models.ForeignKey(TipoSolicitacao, on_delete=models.CASCADE, related_name="+")
+    status = models.CharField(max_length=20, choices=Chamado.Status.choices)
+    qtd = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["solicitante", "tipo", "status"], name="uq_rollup_sol_tipo_status"),
+        ]
+
+    def __str__(self):
+        return f"{self.solicitante_id}/{self.tipo_id}/{self.status}: {self.qtd}"
+
+
+# =========================
+# Histórico de status e SLA
+# =========================
+
+class ChamadoTransicao(models.Model):
+    """
+    Log append-only das mudanças de status (uma linha por transição; 'de'
+    vazio na abertura). Gravado pelos signals de Chamado a partir do snapshot
+    estado_anterior, sem SELECT extra.
+    """
+    chamado = models.ForeignKey(Chamado, on_delete=models.CASCADE, related_name="transicoes")
+    de = models.CharField(max_length=20, choices=Chamado.Status.choices, blank=True)
+    para = models.CharField(max_length=20, choices=Chamado.Status.choices)
+    em = models.DateTimeField(default=timezone.now)
+    autor_nome = models.CharField(max_length=120, blank=True)  # atendente no momento da transição
+
+    class Meta:
+        ordering = ["em", "id"]
+        indexes = [
+            models.Index(fields=["chamado", "em"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.chamado_id}: {self.de or '-'} -> {self.para} em {self.em:%d/%m/%Y %H:%M}"
+
+
+class ChamadoSla(models.Model):
+    """
+    Métricas de SLA do chamado, atualizadas a cada transição (solicitacoes/sla.py);
+    o dashboard/relatório agregam esta tabela sem reprocessar o histórico.
+    """
+    chamado = models.OneToOneField(Chamado, on_delete=models.CASCADE, primary_key=True, related_name="sla")
+    primeira_atribuicao_em = models.DateTimeField(null=True, blank=True)
+    tempo_primeira_atribuicao = models.DurationField(null=True, blank=True)
+    suspenso_desde = models.DateTimeField(null=True, blank=True)  # preenchido enquanto suspenso
+    tempo_suspenso = models.DurationField(default=timedelta(0))   # acumulado das suspensões encerradas
+    suspensoes = models.PositiveIntegerField(default=0)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    tempo_conclusao = models.DurationField(null=True, blank=True)  # criação -> última conclusão
+    transicoes = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"SLA #{self.chamado_id}"
+
+
+# =========================
+# Exportações do relatório (jobs em segundo plano)
+# =========================
+
+def exportacao_upload_path(instance, filename):
+    return f"relatorios/{instance.pk}/{filename}"
+
+
+class ExportacaoRelatorio(models.Model):
+    """
+    Job de exportação do relatório: a view só registra os filtros; o worker
+    (comando 'processar_exportacoes') gera o arquivo em blocos e o salva no storage.
+    """
+    class Formato(models.TextChoices):
+        XLSX = "xlsx", "Excel (XLSX)"
+        CSV = "csv", "CSV"
+
+    class Status(models.TextChoices):
+        PENDENTE = "pendente", "Pendente"
+        PROCESSANDO = "processando", "Processando"
+        CONCLUIDO = "concluido", "Concluído"
+        ERRO = "erro", "Erro"
+
+    solicitado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="exportacoes")
+    formato = models.CharField(max_length=10, choices=Formato.choices, default=Formato.XLSX)
+    filtros = models.JSONField(default=dict, blank=True)
+    # inclui as respostas das perguntas (uma coluna por pergunta)
+    com_respostas = models.BooleanField(default=False)
+    # hash de (formato, filtros, com_respostas): pedidos iguais dentro da janela reaproveitam o arquivo
+    chave = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDENTE)
+    processadas = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    arquivo = models.FileField(upload_to=exportacao_upload_path, blank=True, null=True)
+    erro = models.TextField(blank=True)
+    criado_em = models.DateTimeField(default=timezone.now)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-criado_em"]
+        indexes = [
+            models.Index(fields=["status", "criado_em"]),
+            models.Index(fields=["chave", "criado_em"]),
+        ]
+
+    def __str__(self):
+        return f"Exportação #{self.pk} ({self.formato}) - {self.get_status_display()}"
+
+    @property
+    def percentual(self) -> int:
+        if self.status == self.Status.CONCLUIDO:
+            return 100
+        if not self.total:
+            return 0
+        return min(99, int(self.processadas * 100 / self.total))
+
+
 # =========================
 # Respostas do Colaborador
 # =========================
@@ -212,7 +378,8 @@ class SecaoVista(models.Model):
     )
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     secao = models.CharField(max_length=20, choices=SECOES)
-    last_seen = models.DateTimeField(auto_now=True)
+    # não é auto_now: o flush em lote grava o instante em que a seção foi vista
+    last_seen = models.DateTimeField(default=timezone.now)
 
     class Meta:
         constraints = [
@@ -0,0 +1,143 @@
+# solicitacoes/pagination.py
+import hashlib
+import json
+
+from django.core import signing
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CURSOR_SALT = "solicitacoes.pagination.cursor"
+ESTIMATIVA_TTL = 60  # segundos
+
+
+def _encode_cursor(obj, direcao: str) -> str:
+    """Token opaco (assinado) com a chave (criado_em, id) do item de borda."""
+    return signing.dumps(
+        {"t": obj.criado_em.isoformat(), "id": obj.pk, "d": direcao},
+        salt=CURSOR_SALT, compress=True,
+    )
+
+
+def _decode_cursor(token):
+    """Retorna (criado_em, id, direcao) ou None se o token for vazio/inválido."""
+    if not token:
+        return None
+    try:
+        data = signing.loads(token, salt=CURSOR_SALT)
+        criado_em = parse_datetime(data["t"])
+        pk = int(data["id"])
+        direcao = data.get("d", "n")
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+    if criado_em is None or direcao not in ("n", "p"):
+        return None
+    return criado_em, pk, direcao
+
+
+def estimar_total(qs, timeout: int = ESTIMATIVA_TTL) -> int:
+    """
+    Total aproximado do queryset, com custo constante por página:
+      - PostgreSQL: estimativa do planner (EXPLAIN), sem varrer a tabela
+      - demais bancos: COUNT exato, mas cacheado por alguns segundos por filtro
+    """
+    qs = qs.order_by()
+    connection = connections[qs.db]
+    if connection.vendor == "postgresql":
+        sql, params = qs.query.sql_with_params()
+        with connection.cursor() as cur:
+            cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    key = "keyset:total:" + hashlib.md5(str(qs.query).encode("utf-8")).hexdigest()
+    total = cache.get(key)
+    if total is None:
+        total = qs.count()
+        cache.set(key, total, timeout)
+    return total
+
+
+class KeysetPage:
+    """Página de um KeysetPaginator (interface parecida com a Page do Django)."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginação por cursor (seek) sobre (criado_em, id) decrescente.
+    Usa WHERE (criado_em, id) < (t, id) + LIMIT em vez de OFFSET, então
+    a página N custa o mesmo que a página 1 (índices status+criado_em / criado_em).
+
+    'count' é opcional: se já for conhecido (ex.: contar_secoes), é usado como total;
+    senão 'count' devolve uma estimativa (ver estimar_total).
+    """
+
+    def __init__(self, queryset, per_page: int, count=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self._count = count
+
+    @cached_property
+    def count(self) -> int:
+        if self._count is not None:
+            return self._count
+        return estimar_total(self.queryset)
+
+    def page(self, token=None) -> KeysetPage:
+        cursor = _decode_cursor(token)
+        limit = self.per_page + 1  # 1 extra só para saber se há mais
+
+        if cursor is None:
+            rows = list(self.queryset.order_by("-criado_em", "-id")[:limit])
+            has_more = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            has_next, has_prev = has_more, False
+        else:
+            criado_em, pk, direcao = cursor
+            if direcao == "n":
+                rows = list(
+                    self.queryset.filter(Q(criado_em__lt=criado_em) | Q(criado_em=criado_em, id__lt=pk))
+                    .order_by("-criado_em", "-id")[:limit]
+                )
+                has_more = len(rows) > self.per_page
+                rows = rows[: self.per_page]
+                has_next, has_prev = has_more, True
+            else:
+                rows = list(
+                    self.queryset.filter(Q(criado_em__gt=criado_em) | Q(criado_em=criado_em, id__gt=pk))
+                    .order_by("criado_em", "id")[:limit]
+                )
+                has_more = len(rows) > self.per_page
+                rows = rows[: self.per_page][::-1]
+                has_next, has_prev = True, has_more
+
+        next_cursor = _encode_cursor(rows[-1], "n") if (rows and has_next) else None
+        previous_cursor = _encode_cursor(rows[0], "p") if (rows and has_prev) else None
+        return KeysetPage(rows, self, next_cursor=next_cursor, previous_cursor=previous_cursor)
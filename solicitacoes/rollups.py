@@ -0,0 +1,169 @@
+# solicitacoes/rollups.py
+"""
+Rollup do dashboard: ChamadoRollup guarda quantos chamados existem por
+(solicitante, tipo, status). O dashboard soma essas linhas no escopo de
+visibilidade do usuário, em vez de contar a tabela de chamados.
+"""
+import hashlib
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import Chamado, ChamadoRollup
+from .sla import metricas_sla
+
+
+def _chave(estado: dict):
+    if not estado or None in (estado.get("solicitante_id"), estado.get("tipo_id"), estado.get("status")):
+        return None
+    return (estado["solicitante_id"], estado["tipo_id"], estado["status"])
+
+
+def aplicar_deltas(deltas):
+    """deltas: {(solicitante_id, tipo_id, status): +n/-n}"""
+    deltas = {k: v for k, v in deltas.items() if k is not None and v}
+    if not deltas:
+        return
+    ChamadoRollup.objects.bulk_create(
+        [ChamadoRollup(solicitante_id=s, tipo_id=t, status=st, qtd=0) for (s, t, st), v in deltas.items() if v > 0],
+        ignore_conflicts=True,
+    )
+    for (s, t, st), v in deltas.items():
+        ChamadoRollup.objects.filter(solicitante_id=s, tipo_id=t, status=st).update(qtd=F("qtd") + v)
+
+
+def registrar_mudanca(antes: dict, depois: dict):
+    """Move 1 chamado da chave 'antes' para 'depois' (qualquer um pode ser vazio)."""
+    de, para = _chave(antes), _chave(depois)
+    if de == para:
+        return
+    deltas = Counter()
+    if de:
+        deltas[de] -= 1
+    if para:
+        deltas[para] += 1
+    aplicar_deltas(deltas)
+
+
+def reconstruir_rollup() -> int:
+    """Recalcula o rollup inteiro a partir de Chamado (corrige divergências)."""
+    linhas = (
+        Chamado.objects.order_by()
+        .values("solicitante_id", "tipo_id", "status")
+        .annotate(qtd=Count("pk"))
+    )
+    objs = [ChamadoRollup(**row) for row in linhas]
+    with transaction.atomic():
+        ChamadoRollup.objects.all().delete()
+        ChamadoRollup.objects.bulk_create(objs, batch_size=1000)
+    return len(objs)
+
+
+def dados_dashboard(solicitante_ids=None, top: int = 5) -> dict:
+    """
+    Cards por status + top tipos, lidos do rollup, e médias de SLA (ChamadoSla).
+    solicitante_ids=None -> todos (admin); senão só esses solicitantes.
+    """
+    qs = ChamadoRollup.objects.filter(qtd__gt=0)
+    if solicitante_ids is not None:
+        qs = qs.filter(solicitante_id__in=solicitante_ids)
+
+    por_status = dict(qs.values_list("status").annotate(n=Sum("qtd")).order_by())
+    # agrupado pelo nome do tipo (como a contagem direta em Chamado fazia)
+    top_tipos = list(
+        qs.values_list("tipo__nome").annotate(n=Sum("qtd")).order_by("-n", "tipo__nome")[:top]
+    )
+
+    S = Chamado.Status
+    return {
+        "cards": {
+            "total": sum(por_status.values()),
+            "abertos": por_status.get(S.ABERTO, 0),
+            "andamento": por_status.get(S.EM_ANDAMENTO, 0),
+            "suspensos": por_status.get(S.SUSPENSO, 0),
+            "concluidos": por_status.get(S.CONCLUIDO, 0),
+            "cancelados": por_status.get(S.CANCELADO, 0),
+        },
+        "top_tipos": {
+            "labels": [(nome or "Sem tipo") for nome, _ in top_tipos],
+            "values": [n for _, n in top_tipos],
+        },
+        "sla": metricas_sla(solicitante_ids=solicitante_ids),
+    }
+
+
+# --- Cache da resposta por escopo ---
+# Vários usuários compartilham o mesmo escopo (todos os admins; gestores da mesma
+# gestão), então a chave é o escopo, não o usuário. Qualquer escrita em Chamado
+# muda a versão (signals) e as chaves antigas deixam de ser lidas; o valor vive
+# settings.CACHE_TTL_CURTO.
+DASHBOARD_LOCK_TTL = 10        # segundos
+DASHBOARD_ESPERA = 1.0         # quanto um request espera pelo cálculo de outro
+_VERSAO_KEY = "solicitacoes:dashboard:versao"
+
+
+def _escopo_key(solicitante_ids) -> str:
+    if solicitante_ids is None:
+        return "todos"
+    ids = ",".join(str(i) for i in sorted(solicitante_ids))
+    return hashlib.md5(ids.encode("ascii")).hexdigest()
+
+
+def invalidar_dashboard_cache():
+    try:
+        cache.incr(_VERSAO_KEY)
+    except ValueError:
+        cache.set(_VERSAO_KEY, 2, None)
+
+
+def dados_dashboard_cache(solicitante_ids=None) -> dict:
+    """
+    dados_dashboard() com cache por escopo e proteção contra stampede:
+    só um request por escopo recalcula; os demais esperam um pouco pelo novo
+    valor (nunca recebem o de uma versão anterior) e, se demorar, calculam.
+    """
+    escopo = _escopo_key(solicitante_ids)
+    versao = cache.get_or_set(_VERSAO_KEY, 1, None)
+    key = f"solicitacoes:dashboard:{versao}:{escopo}"
+    lock_key = f"solicitacoes:dashboard:lock:{escopo}"
+
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    if not cache.add(lock_key, 1, DASHBOARD_LOCK_TTL):
+        # outro request já está calculando este escopo
+        limite = time.monotonic() + DASHBOARD_ESPERA
+        while time.monotonic() < limite:
+            time.sleep(0.05)
+            data = cache.get(key)
+            if data is not None:
+                return data
+        return dados_dashboard(solicitante_ids)
+
+    try:
+        data = dados_dashboard(solicitante_ids)
+        cache.set(key, data, settings.CACHE_TTL_CURTO)
+    finally:
+        cache.delete(lock_key)
+    return data
+
+
+def metricas_relatorio_cache(filtros: dict, chamados) -> dict:
+    """
+    metricas_sla() dos chamados filtrados do relatório, em cache por versão do
+    dashboard + filtros: as páginas seguintes (cursor/page) reutilizam o valor
+    em vez de agregar de novo a tabela inteira.
+    """
+    versao = cache.get_or_set(_VERSAO_KEY, 1, None)
+    assinatura = hashlib.md5(repr(sorted(filtros.items())).encode("utf-8")).hexdigest()
+    key = f"solicitacoes:relatorio_sla:{versao}:{assinatura}"
+    data = cache.get(key)
+    if data is None:
+        data = metricas_sla(chamados=chamados)
+        cache.set(key, data, settings.CACHE_TTL_CURTO)
+    return data
@@ -0,0 +1,152 @@
+# solicitacoes/schema.py
+"""
+Schema compilado das perguntas de um TipoSolicitacao (formulário dinâmico,
+validação da abertura e apresentação das respostas).
+
+Montado uma vez por versão do tipo e guardado no cache; a versão muda
+(signals) quando o tipo ou qualquer pergunta dele é salvo/excluído — seja pela
+tela tipo_perguntas, seja pelo admin (nos outros workers, expira em
+settings.CACHE_TTL_CURTO). As telas que mostram perguntas/respostas
+usam o schema em vez de consultar/reflectir PerguntaTipoSolicitacao a cada request.
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import PerguntaTipoSolicitacao, RespostaChamado, TipoSolicitacao
+
+
+@dataclass(frozen=True)
+class PerguntaSchema:
+    id: int
+    texto: str
+    tipo_campo: str
+    obrigatoria: bool
+    ajuda: str
+    opcoes_lista: Tuple[str, ...]  # já separadas (';'), como PerguntaTipoSolicitacao.opcoes_lista
+    ordem: int
+    ativa: bool
+    rotulo_relatorio: str      # mesmo texto de str(pergunta): "<tipo> - <texto[:40]>"
+    oculta_relatorio: bool     # perguntas de anexo não aparecem no modal do relatório
+
+
+@dataclass(frozen=True)
+class SchemaTipo:
+    tipo_id: int
+    nome: str
+    versao: int
+    perguntas: Tuple[PerguntaSchema, ...]   # ordem de exibição (ordem, id)
+
+    @property
+    def perguntas_ativas(self) -> Tuple[PerguntaSchema, ...]:
+        """Perguntas do formulário de abertura (ativas, na ordem)."""
+        return tuple(p for p in self.perguntas if p.ativa)
+
+    def pergunta(self, pergunta_id) -> Optional[PerguntaSchema]:
+        for p in self.perguntas:
+            if p.id == pergunta_id:
+                return p
+        return None
+
+
+def _versao_key(tipo_id) -> str:
+    return f"solicitacoes:schema:versao:{tipo_id}"
+
+
+def _versao(tipo_id) -> int:
+    return cache.get_or_set(_versao_key(tipo_id), 1, None)
+
+
+def invalidar_schema(tipo_id):
+    try:
+        cache.incr(_versao_key(tipo_id))
+    except ValueError:
+        cache.set(_versao_key(tipo_id), 2, None)
+
+
+def _compilar(tipo_id, versao: int) -> Optional[SchemaTipo]:
+    nome = TipoSolicitacao.objects.filter(pk=tipo_id).values_list("nome", flat=True).first()
+    if nome is None:
+        return None
+    perguntas = []
+    for p in PerguntaTipoSolicitacao.objects.filter(tipo_id=tipo_id).order_by("ordem", "id"):
+        rotulo = f"{nome} - {p.texto[:40]}"
+        perguntas.append(PerguntaSchema(
+            id=p.pk,
+            texto=p.texto,
+            tipo_campo=p.tipo_campo,
+            obrigatoria=p.obrigatoria,
+            ajuda=p.ajuda,
+            opcoes_lista=tuple(p.opcoes_lista),
+            ordem=p.ordem,
+            ativa=p.ativa,
+            rotulo_relatorio=rotulo,
+            oculta_relatorio="anexo" in rotulo.lower(),
+        ))
+    return SchemaTipo(tipo_id=tipo_id, nome=nome, versao=versao, perguntas=tuple(perguntas))
+
+
+def schema_do_tipo(tipo_id) -> Optional[SchemaTipo]:
+    """Schema (cacheado) do tipo; None se o tipo não existe."""
+    versao = _versao(tipo_id)
+    key = f"solicitacoes:schema:{tipo_id}:{versao}"
+    schema = cache.get(key)
+    if schema is None:
+        schema = _compilar(tipo_id, versao)
+        if schema is not None:
+            cache.set(key, schema, settings.CACHE_TTL_CURTO)
+    return schema
+
+
+# --- Apresentação de perguntas/respostas de um chamado ---
+
+def _respostas(chamado) -> dict:
+    """{pergunta_id: valor_texto} do chamado (1 query)."""
+    return dict(
+        RespostaChamado.objects.filter(chamado_id=chamado.pk)
+        .order_by()
+        .values_list("pergunta_id", "valor_texto")
+    )
+
+
+def _perguntas_fora_do_schema(ids):
+    """Respostas a perguntas de outro tipo (chamado que mudou de tipo): raro."""
+    if not ids:
+        return []
+    return list(
+        PerguntaTipoSolicitacao.objects.filter(pk__in=ids)
+        .order_by("ordem", "id")
+        .values_list("pk", "texto")
+    )
+
+
+def qa_chamado(chamado):
+    """Lista [{"q", "a"}] para o modal do chamado (todas as respostas dadas)."""
+    respostas = _respostas(chamado)
+    if not respostas:
+        return []
+    schema = schema_do_tipo(chamado.tipo_id)
+    conhecidas = {p.id for p in schema.perguntas} if schema else set()
+    qa = []
+    if schema:
+        for p in schema.perguntas:
+            if p.id in respostas:
+                qa.append({"q": p.texto or "Pergunta", "a": respostas[p.id] or "—"})
+    for pid, texto in _perguntas_fora_do_schema(set(respostas) - conhecidas):
+        qa.append({"q": texto or "Pergunta", "a": respostas[pid] or "—"})
+    return qa
+
+
+def qa_relatorio(chamado):
+    """Lista [{"label", "value"}] para o modal do relatório (todas as perguntas do tipo)."""
+    schema = schema_do_tipo(chamado.tipo_id)
+    if schema is None:
+        return []
+    respostas = _respostas(chamado)
+    return [
+        {"label": p.rotulo_relatorio, "value": respostas.get(p.id) or ""}
+        for p in sorted(schema.perguntas, key=lambda p: p.id)  # ordem original do relatório: por id
+        if not p.oculta_relatorio
+    ]
@@ -0,0 +1,56 @@
+# solicitacoes/services.py
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Chamado, SecaoVista
+from .vistas import secoes_vistas_pendentes
+
+
+# Seções das telas de chamados (chave usada em context/templates -> status)
+SECOES_STATUS = (
+    ("abertos", Chamado.Status.ABERTO),
+    ("andamento", Chamado.Status.EM_ANDAMENTO),
+    ("suspensos", Chamado.Status.SUSPENSO),
+    ("concluidos", Chamado.Status.CONCLUIDO),
+    ("cancelados", Chamado.Status.CANCELADO),
+)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _last_seen_subquery(user, secao: str, pendentes=None):
+    """last_seen da seção para o usuário (epoch quando nunca visitou)."""
+    if pendentes and secao in pendentes:
+        # "visto" ainda no buffer write-behind é sempre o mais recente
+        return Value(pendentes[secao])
+    sq = SecaoVista.objects.filter(user=user, secao=secao).values("last_seen")[:1]
+    return Coalesce(Subquery(sq), Value(EPOCH))
+
+
+def contar_secoes(qs, user=None):
+    """
+    Conta os chamados de 'qs' por seção em UMA única query (agregação condicional).
+
+    Retorna (counts, novos):
+      - counts: {secao: total}
+      - novos:  {secao: atualizados desde o último 'visto' da seção} (vazio se user=None)
+    """
+    aggs = {}
+    pendentes = secoes_vistas_pendentes(user) if user is not None else None
+    for secao, status in SECOES_STATUS:
+        aggs[f"total_{secao}"] = Count("pk", filter=Q(status=status))
+        if user is not None:
+            aggs[f"novos_{secao}"] = Count(
+                "pk", filter=Q(status=status, atualizado_em__gt=_last_seen_subquery(user, secao, pendentes))
+            )
+
+    row = qs.order_by().aggregate(**aggs)
+
+    counts = {secao: row[f"total_{secao}"] or 0 for secao, _ in SECOES_STATUS}
+    novos = {}
+    if user is not None:
+        novos = {secao: row[f"novos_{secao}"] or 0 for secao, _ in SECOES_STATUS}
+    return counts, novos
+
@@ -0,0 +1,58 @@
+# solicitacoes/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Chamado, PerguntaTipoSolicitacao, TipoSolicitacao
+from .rollups import invalidar_dashboard_cache, registrar_mudanca
+from .schema import invalidar_schema
+from .sla import registrar_abertura, registrar_transicao
+from .visibilidade import invalidar_tipos_visiveis
+
+
+# Rollup do dashboard (ChamadoRollup): manutenção incremental, na mesma transação do save
+@receiver(post_save, sender=Chamado)
+def _rollup_on_save(sender, instance: Chamado, created: bool, update_fields=None, **kwargs):
+    antes = {} if created else getattr(instance, "estado_anterior", {})
+    registrar_mudanca(antes, instance.estado_salvo(update_fields))
+    transaction.on_commit(invalidar_dashboard_cache)
+
+
+# Histórico de status + SLA (solicitacoes/sla.py): mesmo snapshot, sem SELECT extra
+@receiver(post_save, sender=Chamado)
+def _historico_on_save(sender, instance: Chamado, created: bool, update_fields=None, **kwargs):
+    if created:
+        registrar_abertura(instance)
+        return
+    de = getattr(instance, "estado_anterior", {}).get("status")
+    para = instance.estado_salvo(update_fields).get("status")
+    registrar_transicao(instance, de, para)
+
+
+@receiver(post_delete, sender=Chamado)
+def _rollup_on_delete(sender, instance: Chamado, **kwargs):
+    registrar_mudanca(getattr(instance, "_estado_db", None) or instance.estado_salvo(), {})
+    transaction.on_commit(invalidar_dashboard_cache)
+
+
+# Schema compilado das perguntas (solicitacoes/schema.py): nova versão a cada
+# alteração do tipo ou de suas perguntas (tela tipo_perguntas e admin)
+@receiver(post_save, sender=TipoSolicitacao)
+@receiver(post_delete, sender=TipoSolicitacao)
+def _schema_on_tipo_change(sender, instance: TipoSolicitacao, **kwargs):
+    tipo_id = instance.pk
+    transaction.on_commit(lambda: invalidar_schema(tipo_id))
+
+
+@receiver(post_save, sender=PerguntaTipoSolicitacao)
+@receiver(post_delete, sender=PerguntaTipoSolicitacao)
+def _schema_on_pergunta_change(sender, instance: PerguntaTipoSolicitacao, **kwargs):
+    tipo_id = instance.tipo_id
+    transaction.on_commit(lambda: invalidar_schema(tipo_id))
+
+
+# Índice setor -> tipos visíveis (solicitacoes/visibilidade.py)
+@receiver(post_save, sender=TipoSolicitacao)
+@receiver(post_delete, sender=TipoSolicitacao)
+def _visibilidade_on_tipo_change(sender, instance: TipoSolicitacao, **kwargs):
+    transaction.on_commit(invalidar_tipos_visiveis)
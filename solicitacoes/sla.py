@@ -0,0 +1,132 @@
+# solicitacoes/sla.py
+"""
+Histórico de status (ChamadoTransicao) e métricas de SLA (ChamadoSla).
+
+Os signals de Chamado chamam registrar_abertura / registrar_transicao com o
+status antes/depois do save (snapshot estado_anterior, sem SELECT extra). Cada
+transição acrescenta uma linha ao log e atualiza as métricas do chamado:
+  - tempo até a 1ª atribuição (1ª entrada em "em andamento")
+  - tempo total suspenso (e quantas suspensões)
+  - tempo até a conclusão (última conclusão; volta a vazio se reaberto)
+metricas_sla() agrega essas colunas para o dashboard/relatório.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import Chamado, ChamadoSla, ChamadoTransicao
+
+S = Chamado.Status
+
+
+def registrar_abertura(chamado, quando=None):
+    """Primeira linha do histórico + linha de SLA do chamado recém-criado."""
+    quando = quando or chamado.criado_em or timezone.now()
+    ChamadoTransicao.objects.create(chamado=chamado, de="", para=chamado.status, em=quando)
+    sla = ChamadoSla(chamado=chamado, transicoes=1)
+    _aplicar(sla, chamado, "", chamado.status, quando)
+    sla.save(force_insert=True)
+
+
+def _aplicar(sla: ChamadoSla, chamado, de: str, para: str, quando):
+    """Atualiza as métricas em memória para a transição de -> para."""
+    inicio = chamado.criado_em or quando
+    if para == S.EM_ANDAMENTO and sla.primeira_atribuicao_em is None:
+        sla.primeira_atribuicao_em = quando
+        sla.tempo_primeira_atribuicao = quando - inicio
+    if de == S.SUSPENSO and sla.suspenso_desde is not None:
+        sla.tempo_suspenso += quando - sla.suspenso_desde
+        sla.suspenso_desde = None
+    if para == S.SUSPENSO:
+        sla.suspenso_desde = quando
+        sla.suspensoes += 1
+    if para == S.CONCLUIDO:
+        sla.concluido_em = quando
+        sla.tempo_conclusao = quando - inicio
+    elif de == S.CONCLUIDO:
+        sla.concluido_em = None
+        sla.tempo_conclusao = None
+
+
+def registrar_transicao(chamado, de: str, para: str, quando=None):
+    """Acrescenta a transição ao log e atualiza o SLA (na transação do save)."""
+    if not de or de == para:
+        return
+    quando = quando or timezone.now()
+    with transaction.atomic():
+        ChamadoTransicao.objects.create(
+            chamado=chamado, de=de, para=para, em=quando,
+            autor_nome=(chamado.atendente_nome or "")[:120],
+        )
+        sla = ChamadoSla.objects.select_for_update().filter(chamado_id=chamado.pk).first()
+        if sla is None:
+            # chamado anterior ao histórico: começa a medir a partir daqui
+            sla = ChamadoSla(chamado_id=chamado.pk)
+            if de == S.SUSPENSO:
+                sla.suspenso_desde = chamado.suspenso_em
+        _aplicar(sla, chamado, de, para, quando)
+        sla.transicoes += 1
+        sla.save()
+
+
+def reconstruir_sla(chamado_ids=None) -> int:
+    """Recalcula ChamadoSla a partir do log (corrige divergências); retorna quantos."""
+    chamados = (
+        Chamado.objects.filter(transicoes__isnull=False).distinct().only("pk", "criado_em", "suspenso_em")
+    )
+    if chamado_ids is not None:
+        chamados = chamados.filter(pk__in=chamado_ids)
+    total = 0
+    for chamado in chamados.iterator(chunk_size=500):
+        sla = ChamadoSla(chamado_id=chamado.pk)
+        for t in chamado.transicoes.order_by("em", "id"):
+            if sla.transicoes == 0 and t.de == S.SUSPENSO:
+                # chamado já suspenso antes do histórico: mesmo ponto de partida de registrar_transicao
+                sla.suspenso_desde = chamado.suspenso_em
+            _aplicar(sla, chamado, t.de, t.para, t.em)
+            sla.transicoes += 1
+        sla.save()
+        total += 1
+    return total
+
+
+def _horas(valor):
+    if valor is None:
+        return None
+    if not isinstance(valor, timedelta):
+        valor = timedelta(microseconds=valor)  # bancos sem tipo interval devolvem microssegundos
+    return round(valor.total_seconds() / 3600, 1)
+
+
+def metricas_sla(chamados=None, solicitante_ids=None) -> dict:
+    """
+    Médias de SLA (em horas) em UMA query sobre ChamadoSla.
+    chamados: queryset de Chamado (filtros do relatório); solicitante_ids: escopo do dashboard.
+    """
+    qs = ChamadoSla.objects.all()
+    if chamados is not None:
+        qs = qs.filter(chamado__in=chamados.order_by().values("pk"))
+    if solicitante_ids is not None:
+        qs = qs.filter(chamado__solicitante_id__in=solicitante_ids)
+    agg = qs.aggregate(
+        medidos=Count("pk"),
+        atribuidos=Count("pk", filter=Q(primeira_atribuicao_em__isnull=False)),
+        concluidos=Count("pk", filter=Q(concluido_em__isnull=False)),
+        total_suspensoes=Sum("suspensoes"),
+        media_primeira_atribuicao=Avg("tempo_primeira_atribuicao"),
+        media_conclusao=Avg("tempo_conclusao"),
+        media_suspenso=Avg("tempo_suspenso", filter=Q(suspensoes__gt=0)),
+        maior_conclusao=Max("tempo_conclusao"),
+    )
+    return {
+        "medidos": agg["medidos"],
+        "atribuidos": agg["atribuidos"],
+        "concluidos": agg["concluidos"],
+        "suspensoes": agg["total_suspensoes"] or 0,
+        "horas_ate_atribuicao": _horas(agg["media_primeira_atribuicao"]),
+        "horas_ate_conclusao": _horas(agg["media_conclusao"]),
+        "horas_suspenso": _horas(agg["media_suspenso"]),
+        "horas_maior_conclusao": _horas(agg["maior_conclusao"]),
+    }
@@ -1,3 +1,423 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.testing import BaseTestCase, criar_usuario
+
+from . import rollups
+from .abertura import abrir_chamado, coletar_respostas
+from .conversa import cursor_mensagem, ler_cursor, mensagens_antes, mensagens_depois
+from .exports import filtros_relatorio, relatorio_queryset
+from .models import (
+    Chamado,
+    ChamadoMensagem,
+    ChamadoRollup,
+    ChamadoSla,
+    ChamadoTransicao,
+    ChamadoVista,
+    PerguntaTipoSolicitacao,
+    RespostaChamado,
+    SecaoVista,
+    TipoSolicitacao,
+)
+from .pagination import KeysetPaginator
+from .rollups import dados_dashboard_cache, metricas_relatorio_cache, reconstruir_rollup
+from .schema import schema_do_tipo
+from .sla import reconstruir_sla
+from .views import _paginar, chamado_mensagens_novas, form_campos_por_tipo
+from .visibilidade import tipos_visiveis_ids
+from .vistas import BufferVistas, registrar_chamados_vistos, registrar_secao_vista
+
+
+class SchemaTipoTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tipo = TipoSolicitacao.objects.create(nome="Férias")
+        self.p1 = PerguntaTipoSolicitacao.objects.create(
+            tipo=self.tipo, texto="Período", ordem=2, tipo_campo="choice", opcoes="Manhã; Tarde ;",
+        )
+        self.p2 = PerguntaTipoSolicitacao.objects.create(tipo=self.tipo, texto="Motivo", ordem=1, obrigatoria=False)
+
+    def test_schema_ordenado_com_opcoes_separadas(self):
+        schema = schema_do_tipo(self.tipo.pk)
+        self.assertEqual([p.id for p in schema.perguntas_ativas], [self.p2.pk, self.p1.pk])
+        self.assertEqual(schema.pergunta(self.p1.pk).opcoes_lista, ("Manhã", "Tarde"))
+
+    def test_segunda_leitura_sem_query(self):
+        schema_do_tipo(self.tipo.pk)
+        with self.assertNumQueries(0):
+            schema_do_tipo(self.tipo.pk)
+
+    def test_edicao_muda_a_versao(self):
+        schema_do_tipo(self.tipo.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.p2.ativa = False
+            self.p2.save()
+        self.assertEqual([p.id for p in schema_do_tipo(self.tipo.pk).perguntas_ativas], [self.p1.pk])
+
+    def test_form_campos_sem_query_de_perguntas(self):
+        # as rotas HTML ficam fora do urlpatterns final de config/urls.py: chama a view direto
+        request = RequestFactory().get("/")
+        request.user = self.user
+        form_campos_por_tipo(request, self.tipo.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = form_campos_por_tipo(request, self.tipo.pk)
+        self.assertContains(resp, "Tarde</option>")
+        self.assertFalse([q for q in ctx.captured_queries if "perguntatiposolicitacao" in q["sql"]])
+
+    def test_obrigatoria_vazia_nao_cria_chamado(self):
+        with self.assertRaises(ValidationError):
+            coletar_respostas(schema_do_tipo(self.tipo.pk), QueryDict(""), {})
+        self.assertFalse(Chamado.objects.exists())
+
+    def test_abertura_grava_respostas(self):
+        schema = schema_do_tipo(self.tipo.pk)
+        respostas = coletar_respostas(schema, QueryDict(f"pergunta_{self.p1.pk}=Tarde"), {})
+        chamado = abrir_chamado(self.user, self.tipo, respostas)
+        self.assertEqual(
+            dict(RespostaChamado.objects.filter(chamado=chamado).values_list("pergunta_id", "valor_texto")),
+            {self.p1.pk: "Tarde", self.p2.pk: ""},
+        )
+
+
+class TiposVisiveisTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.setor = "RH"
+        self.livre = TipoSolicitacao.objects.create(nome="Livre")
+        self.rh = TipoSolicitacao.objects.create(nome="Só RH", setores_permitidos="rh; TI")
+        self.ti = TipoSolicitacao.objects.create(nome="Só TI", setores_permitidos="TI")
+
+    def test_equivale_a_visivel_para(self):
+        esperados = {t.pk for t in TipoSolicitacao.objects.all() if t.visivel_para(self.user)}
+        self.assertEqual(tipos_visiveis_ids(self.user), esperados)
+        self.assertEqual(esperados, {self.livre.pk, self.rh.pk})
+
+    def test_edicao_de_tipo_invalida_o_mapa(self):
+        tipos_visiveis_ids(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ti.setores_permitidos = "TI; RH"
+            self.ti.save()
+            self.livre.ativo = False
+            self.livre.save()
+        self.assertEqual(tipos_visiveis_ids(self.user), {self.rh.pk, self.ti.pk})
+
+    def test_exclusao_de_tipo_invalida_o_mapa(self):
+        tipos_visiveis_ids(self.user)
+        with self.assertNumQueries(0):
+            tipos_visiveis_ids(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rh.delete()
+        self.assertEqual(tipos_visiveis_ids(self.user), {self.livre.pk})
+
+
+class AnexosAberturaTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        storages = {**settings.STORAGES, "default": {**settings.STORAGES["default"]}}
+        storages["default"]["OPTIONS"] = {**storages["default"].get("OPTIONS", {}), "location": self.media}
+        override = override_settings(MEDIA_ROOT=self.media, STORAGES=storages)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.tipo = TipoSolicitacao.objects.create(nome="Reembolso")
+        arquivo = PerguntaTipoSolicitacao.TipoCampo.ARQUIVO
+        self.p1 = PerguntaTipoSolicitacao.objects.create(tipo=self.tipo, texto="Nota", ordem=1, tipo_campo=arquivo)
+        self.p2 = PerguntaTipoSolicitacao.objects.create(tipo=self.tipo, texto="Recibo", ordem=2, tipo_campo=arquivo)
+
+    def _respostas(self):
+        files = {
+            f"pergunta_{self.p1.pk}_file": SimpleUploadedFile("nota.pdf", b"nota"),
+            f"pergunta_{self.p2.pk}_file": SimpleUploadedFile("recibo.pdf", b"recibo"),
+        }
+        return coletar_respostas(schema_do_tipo(self.tipo.pk), QueryDict(""), files)
+
+    def test_anexos_gravados_antes_do_retorno(self):
+        chamado = abrir_chamado(self.user, self.tipo, self._respostas())
+        respostas = RespostaChamado.objects.filter(chamado=chamado).order_by("pergunta__ordem")
+        self.assertEqual([r.valor_arquivo.read() for r in respostas], [b"nota", b"recibo"])
+
+    def test_falha_no_storage_nao_cria_nada(self):
+        salvar = FileSystemStorage._save
+        chamadas = []
+
+        def _save(storage, name, content):
+            chamadas.append(name)
+            if len(chamadas) == 2:
+                raise OSError("disco cheio")
+            return salvar(storage, name, content)
+
+        with mock.patch.object(FileSystemStorage, "_save", _save), self.assertLogs("solicitacoes.abertura"):
+            with self.assertRaises(ValidationError):
+                abrir_chamado(self.user, self.tipo, self._respostas())
+        self.assertFalse(Chamado.objects.exists())
+        self.assertFalse(RespostaChamado.objects.exists())
+        self.assertFalse(FileSystemStorage(location=self.media).exists(chamadas[0]))
+
+
+class SlaTests(BaseTestCase):
+    CAMPOS = (
+        "primeira_atribuicao_em", "tempo_primeira_atribuicao", "suspenso_desde", "tempo_suspenso",
+        "suspensoes", "concluido_em", "tempo_conclusao", "transicoes",
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.tipo = TipoSolicitacao.objects.create(nome="Férias")
+        self.chamado = Chamado.objects.create(solicitante=self.user, tipo=self.tipo)
+
+    def _sla(self):
+        sla = ChamadoSla.objects.get(chamado=self.chamado)
+        return {f: getattr(sla, f) for f in self.CAMPOS}
+
+    def _mudar(self, status):
+        self.chamado.status = status
+        if status == Chamado.Status.SUSPENSO:
+            self.chamado.suspender()
+        self.chamado.save()
+
+    def test_incremental_igual_a_reconstrucao(self):
+        S = Chamado.Status
+        for status in (S.EM_ANDAMENTO, S.SUSPENSO, S.EM_ANDAMENTO, S.SUSPENSO, S.EM_ANDAMENTO, S.CONCLUIDO):
+            self._mudar(status)
+        incremental = self._sla()
+        self.assertEqual(incremental["suspensoes"], 2)
+        self.assertEqual(incremental["transicoes"], 7)
+        self.assertIsNotNone(incremental["concluido_em"])
+
+        ChamadoSla.objects.all().delete()
+        self.assertEqual(reconstruir_sla(), 1)
+        self.assertEqual(self._sla(), incremental)
+
+    def test_suspenso_antes_do_historico(self):
+        # chamado legado: já suspenso há 2 dias e sem histórico/SLA
+        suspenso_em = timezone.now() - timedelta(days=2)
+        ChamadoTransicao.objects.all().delete()
+        ChamadoSla.objects.all().delete()
+        Chamado.objects.filter(pk=self.chamado.pk).update(status=Chamado.Status.SUSPENSO, suspenso_em=suspenso_em)
+        self.chamado = Chamado.objects.get(pk=self.chamado.pk)
+
+        self._mudar(Chamado.Status.EM_ANDAMENTO)
+        incremental = self._sla()
+        self.assertGreaterEqual(incremental["tempo_suspenso"], timedelta(days=2))
+
+        reconstruir_sla([self.chamado.pk])
+        self.assertEqual(self._sla(), incremental)
+
+    def test_metricas_do_relatorio_em_cache_por_versao(self):
+        filtros = filtros_relatorio({"tipo": str(self.tipo.pk)})
+        self.assertEqual(metricas_relatorio_cache(filtros, relatorio_queryset(filtros))["medidos"], 1)
+        with self.assertNumQueries(0):  # próximas páginas do mesmo filtro
+            metricas_relatorio_cache(filtros, relatorio_queryset(filtros))
+        with self.captureOnCommitCallbacks(execute=True):
+            Chamado.objects.create(solicitante=self.user, tipo=self.tipo)
+        self.assertEqual(metricas_relatorio_cache(filtros, relatorio_queryset(filtros))["medidos"], 2)
+
+
+class RollupTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.outro = criar_usuario("11144477735", "bia@enprodes.com.br")
+        self.ferias = TipoSolicitacao.objects.create(nome="Férias")
+        self.compra = TipoSolicitacao.objects.create(nome="Compra")
+
+    def _rollup(self):
+        return {
+            (r.solicitante_id, r.tipo_id, r.status): r.qtd
+            for r in ChamadoRollup.objects.filter(qtd__gt=0)
+        }
+
+    def test_deltas_iguais_a_reconstrucao(self):
+        S = Chamado.Status
+        a = Chamado.objects.create(solicitante=self.user, tipo=self.ferias)
+        b = Chamado.objects.create(solicitante=self.user, tipo=self.compra)
+        c = Chamado.objects.create(solicitante=self.outro, tipo=self.ferias)
+        Chamado.objects.create(solicitante=self.outro, tipo=self.compra)
+
+        a.status = S.EM_ANDAMENTO
+        a.save(update_fields=["status"])
+        b.tipo = self.ferias
+        b.status = S.CONCLUIDO
+        b.save()
+        c.solicitante = self.user
+        c.save(update_fields=["solicitante"])
+        c = Chamado.objects.only("pk").get(pk=c.pk)  # campos adiados: estado lido do banco
+        c.status = S.CANCELADO
+        c.save(update_fields=["status"])
+        Chamado.objects.filter(solicitante=self.outro).get().delete()
+
+        incremental = self._rollup()
+        self.assertEqual(sum(incremental.values()), 3)
+        reconstruir_rollup()
+        self.assertEqual(self._rollup(), incremental)
+
+    def test_top_tipos_por_nome(self):
+        abono = TipoSolicitacao.objects.create(nome="Abono")
+        for tipo in (self.ferias, self.compra, abono, self.ferias):
+            Chamado.objects.create(solicitante=self.user, tipo=tipo)
+        self.assertEqual(
+            rollups.dados_dashboard()["top_tipos"],
+            {"labels": ["Férias", "Abono", "Compra"], "values": [2, 1, 1]},  # empate: ordem do nome
+        )
+
+    def test_cache_invalidado_por_escrita(self):
+        Chamado.objects.create(solicitante=self.user, tipo=self.ferias)
+        self.assertEqual(dados_dashboard_cache()["cards"]["total"], 1)
+        with self.assertNumQueries(0):
+            dados_dashboard_cache()
+        with self.captureOnCommitCallbacks(execute=True):
+            Chamado.objects.create(solicitante=self.outro, tipo=self.compra)
+        self.assertEqual(dados_dashboard_cache()["cards"]["total"], 2)
+        self.assertEqual(dados_dashboard_cache([self.outro.pk])["cards"]["total"], 1)
+
+    def test_sem_valor_de_versao_anterior_durante_recalculo(self):
+        Chamado.objects.create(solicitante=self.user, tipo=self.ferias)
+        dados_dashboard_cache()
+        with self.captureOnCommitCallbacks(execute=True):
+            Chamado.objects.create(solicitante=self.user, tipo=self.compra)
+        cache.add("solicitacoes:dashboard:lock:todos", 1)  # outro request recalculando
+        with mock.patch.object(rollups, "DASHBOARD_ESPERA", 0.1):
+            self.assertEqual(dados_dashboard_cache()["cards"]["total"], 2)
+
+
+class KeysetPaginatorTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        tipo = TipoSolicitacao.objects.create(nome="Férias")
+        base = timezone.now()
+        for i in range(8):
+            c = Chamado.objects.create(solicitante=self.user, tipo=tipo)
+            # pares com o mesmo criado_em: o id desempata
+            Chamado.objects.filter(pk=c.pk).update(criado_em=base - timedelta(minutes=i // 2))
+        self.esperado = list(Chamado.objects.order_by("-criado_em", "-id").values_list("pk", flat=True))
+        self.paginator = KeysetPaginator(Chamado.objects.all(), 3)
+
+    def _ids(self, page):
+        return [c.pk for c in page]
+
+    def test_percorre_sem_repetir_nem_pular(self):
+        paginas, page = [], self.paginator.page()
+        while True:
+            paginas.append(page)
+            if not page.has_next():
+                break
+            page = self.paginator.page(page.next_cursor)
+        self.assertEqual([pk for p in paginas for pk in self._ids(p)], self.esperado)
+        self.assertEqual([len(p) for p in paginas], [3, 3, 2])
+        self.assertFalse(paginas[0].has_previous())
+
+        # voltando pelo previous_cursor: as mesmas páginas
+        anterior = self.paginator.page(paginas[2].previous_cursor)
+        self.assertEqual(self._ids(anterior), self._ids(paginas[1]))
+        primeira = self.paginator.page(anterior.previous_cursor)
+        self.assertEqual(self._ids(primeira), self._ids(paginas[0]))
+        self.assertFalse(primeira.has_previous())
+
+    def test_cursor_adulterado_volta_para_a_primeira_pagina(self):
+        cursor = self.paginator.page().next_cursor
+        adulterado = cursor[:-2] + ("AA" if not cursor.endswith("AA") else "BB")
+        for token in (adulterado, "lixo", cursor.split(":")[0]):
+            self.assertEqual(self._ids(self.paginator.page(token)), self.esperado[:3])
+
+    def test_paginar_usa_cursor_desde_a_primeira_pagina(self):
+        qs = Chamado.objects.order_by("-criado_em")
+        page = _paginar(qs, 3, "pg_a", RequestFactory().get("/"), count=8)
+        self.assertTrue(page.is_keyset)
+        self.assertEqual(self._ids(page), self.esperado[:3])
+
+        seguinte = _paginar(qs, 3, "pg_a", RequestFactory().get("/", {"cur_a": page.next_cursor}), count=8)
+        self.assertEqual(self._ids(seguinte), self.esperado[3:6])
+
+        # links numerados antigos (pg_a) continuam caindo no OFFSET
+        numerada = _paginar(qs, 3, "pg_a", RequestFactory().get("/", {"pg_a": 2}), count=8)
+        self.assertFalse(getattr(numerada, "is_keyset", False))
+        self.assertEqual(numerada.number, 2)
+
+
+class ConversaCursorTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.chamado = Chamado.objects.create(solicitante=self.user, tipo=TipoSolicitacao.objects.create(nome="Férias"))
+        base = timezone.now()
+        self.msgs = [
+            ChamadoMensagem.objects.create(
+                chamado=self.chamado, autor=self.user, texto=f"m{i}", criado_em=base + timedelta(seconds=i // 2),
+                visibilidade=ChamadoMensagem.INTERNA if i == 3 else ChamadoMensagem.PUBLICA,
+            )
+            for i in range(6)
+        ]
+
+    def _get(self, **params):
+        request = RequestFactory().get("/", params)
+        request.user = self.user
+        return chamado_mensagens_novas(request, self.chamado.pk)
+
+    def test_cursor_ida_e_volta(self):
+        cursor = cursor_mensagem(self.msgs[1])
+        self.assertEqual(ler_cursor(cursor), (self.msgs[1].criado_em, self.msgs[1].pk))
+        qs = ChamadoMensagem.objects.filter(chamado=self.chamado)
+        self.assertEqual(mensagens_depois(qs, ler_cursor(cursor)), self.msgs[2:])
+        self.assertEqual(mensagens_antes(qs, ler_cursor(cursor)), (self.msgs[:1], False))
+        self.assertEqual(mensagens_antes(qs, limite=4), (self.msgs[2:], True))
+
+    def test_cursor_invalido(self):
+        for valor in ("", "abc-1", "123", "-5", "1-x", "9" * 40 + "-1"):
+            self.assertIsNone(ler_cursor(valor), valor)
+        self.assertEqual(self._get(after="abc-1").status_code, 400)
+        self.assertEqual(self._get(before="").status_code, 400)
+
+    def test_novas_respeita_visibilidade(self):
+        resp = self._get(after=cursor_mensagem(self.msgs[1]))
+        data = json.loads(resp.content)
+        self.assertEqual(data["quantidade"], 3)  # m3 é interna
+        self.assertNotIn("m3", data["html"])
+        self.assertEqual(data["cursor_fim"], cursor_mensagem(self.msgs[5]))
+        self.assertEqual(json.loads(self._get(after=data["cursor_fim"]).content)["quantidade"], 0)
+
+
+@override_settings(SOLICITACOES_VISTAS_FLUSH_SEGUNDOS=0)
+class VistasTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        tipo = TipoSolicitacao.objects.create(nome="Férias")
+        self.c1 = Chamado.objects.create(solicitante=self.user, tipo=tipo)
+        self.c2 = Chamado.objects.create(solicitante=self.user, tipo=tipo)
+
+    def test_flush_atrasado_nao_volta_last_seen(self):
+        agora = timezone.now()
+        antes = agora - timedelta(minutes=5)
+        # outro processo gravou o valor mais novo de c1; o buffer deste ainda tem o antigo
+        registrar_chamados_vistos(self.user, [self.c1.pk], quando=agora)
+        registrar_secao_vista(self.user, "abertos", quando=agora)
+        buffer = BufferVistas()
+        with mock.patch.object(buffer, "_iniciar_flusher"):  # flush manual, sem thread
+            buffer.registrar(
+                {(self.user.pk, self.c1.pk): antes, (self.user.pk, self.c2.pk): antes},
+                {(self.user.pk, "abertos"): antes},
+            )
+        buffer.flush()
+        vistas = dict(ChamadoVista.objects.values_list("chamado_id", "last_seen"))
+        self.assertEqual(vistas, {self.c1.pk: agora, self.c2.pk: antes})
+        self.assertEqual(SecaoVista.objects.get(user=self.user, secao="abertos").last_seen, agora)
+
+    def test_valor_mais_novo_avanca(self):
+        antes = timezone.now() - timedelta(minutes=5)
+        registrar_chamados_vistos(self.user, [self.c1.pk, self.c2.pk], quando=antes)
+        agora = timezone.now()
+        registrar_chamados_vistos(self.user, [self.c1.pk], quando=agora)
+        vistas = dict(ChamadoVista.objects.values_list("chamado_id", "last_seen"))
+        self.assertEqual(vistas, {self.c1.pk: agora, self.c2.pk: antes})
@@ -19,6 +19,7 @@ urlpatterns = [
     path("chamados/<int:pk>/tratar/", views.tratar_chamado, name="tratar_chamado"),
     path("chamados/<int:pk>/abertura/", views.chamado_abertura_partial, name="chamado_abertura_partial"),
     path("chamados/<int:pk>/mensagens/", views.chamado_mensagens_partial, name="chamado_mensagens_partial"),
+    path("chamados/<int:pk>/mensagens/novas/", views.chamado_mensagens_novas, name="chamado_mensagens_novas"),
     path("chamados/<int:pk>/mensagens/enviar/", views.chamado_enviar_mensagem, name="chamado_enviar_mensagem"),
 
     # --- Administrativo
@@ -60,7 +61,19 @@ urlpatterns = [
         name="relatorio_chamado_modal",
     ),
     path("relatorio/chamado/<int:pk>/", views.relatorio_chamado_modal, name="relatorio_chamado_modal"),
+    path(
+        "relatorio/chamado/<int:pk>/mensagens/",
+        views.relatorio_chamado_mensagens,
+        name="relatorio_chamado_mensagens",
+    ),
     path("relatorio/chamado/<int:pk>/delete/", views.relatorio_chamado_delete, name="relatorio_chamado_delete"),
+    path("relatorio/exportar/", views.relatorio_exportar, name="relatorio_exportar"),
+    path("relatorio/exportacoes/<int:pk>/", views.relatorio_exportacao_status, name="relatorio_exportacao_status"),
+    path(
+        "relatorio/exportacoes/<int:pk>/download/",
+        views.relatorio_exportacao_download,
+        name="relatorio_exportacao_download",
+    ),
     
 
 ]
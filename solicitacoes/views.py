@@ -1,33 +1,34 @@
 
 import re
-import time
-from datetime import date, datetime, timedelta
-from io import BytesIO
+from datetime import datetime, timedelta
 from urllib.parse import urlencode
 from django.contrib import messages
-from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.cache import cache
-from django.core.exceptions import PermissionDenied
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.paginator import EmptyPage, Paginator
-from django.db import OperationalError, transaction
+from django.db import transaction
 from django.db.models import Count, Max, Q
 from django.forms import inlineformset_factory
 from django.http import (
+    FileResponse,
     Http404,
     HttpResponse,
     HttpResponseBadRequest,
     HttpResponseForbidden,
     JsonResponse,
+    StreamingHttpResponse,
 )
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.timezone import now
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_http_methods, require_POST
 from accounts.models import User  # acesso às constantes de perfil
+from accounts.principal import equipe_ids, get_principal
 from .forms import (
     ChamadoMensagemForm,
     NovaSolicitacaoTipoForm,
@@ -42,12 +43,33 @@ from django.shortcuts import get_object_or_404, render
 from .models import (
     Chamado,
     ChamadoMensagem,
-    ChamadoVista,
+    ExportacaoRelatorio,
     PerguntaTipoSolicitacao,
-    RespostaChamado,
-    SecaoVista,
     TipoSolicitacao,
 )
+from .abertura import abrir_chamado, coletar_respostas
+from .conversa import (
+    RELATORIO_MENSAGENS,
+    cursor_mensagem,
+    ler_cursor,
+    mensagens_antes,
+    mensagens_depois,
+    mensagens_visiveis,
+    timeline_compacta,
+)
+from .exports import (
+    csv_stream,
+    dados_exportacao,
+    filtros_relatorio,
+    relatorio_queryset,
+    solicitar_exportacao,
+    xlsx_temporario,
+)
+from .pagination import KeysetPaginator
+from .rollups import dados_dashboard_cache, metricas_relatorio_cache
+from .schema import qa_chamado, qa_relatorio, schema_do_tipo
+from .services import contar_secoes
+from .vistas import registrar_chamados_vistos, registrar_secao_vista, ultimas_vistas_chamados
 
 
 # Para onde voltar após mudança de status (admins)
@@ -63,30 +85,46 @@ def _perfil_is_admin(user) -> bool:
     p = (getattr(user, "perfil", "") or "").strip().upper()
     return p in {getattr(User, "PERFIL_ADMIN", "ADMINISTRADOR"), "ADMIN", "ADMINISTRADOR", "ADMINISTRATIVO"}
 
-def visible_chamados_for(user, base_qs):
+def solicitantes_visiveis(user):
     """
-    Restringe 'base_qs' aos chamados visíveis pelo usuário.
-    - Admin (perfil) ou superuser: tudo
-    - Gestor: dele + equipe (mesma gestao ou grupo GESTAO_<gestao>)
-    - Colaborador: apenas dele
+    Escopo de visibilidade em ids de solicitante:
+      - None: tudo (admin/superuser)
+      - set de ids: gestor (próprio + equipe) ou colaborador (só ele); vazio p/ anônimo
     """
     if not user.is_authenticated:
-        return base_qs.none()
+        return set()
 
     # >>> administrador (qualquer variação) ou superuser vê tudo
     if user.is_superuser or _perfil_is_admin(user):
-        return base_qs
+        return None
 
     # >>> gestor vê os próprios + equipe
+    # (equipe resolvida para ids 1x por request: IN simples, sem join em grupos nem DISTINCT)
     if (getattr(user, "perfil", "") or "").strip().upper() == "GESTOR":
-        cond = Q(solicitante=user)
+        ids = {user.pk}
         gestao = (getattr(user, "gestao", "") or "").strip()
         if gestao and gestao.upper() != getattr(User, "GESTAO_SEM", "NA"):
-            cond |= Q(solicitante__gestao=gestao) | Q(solicitante__groups__name=f"GESTAO_{gestao}")
-        return base_qs.filter(cond).distinct()
+            ids |= equipe_ids(user)
+        return ids
 
     # >>> colaborador
-    return base_qs.filter(solicitante=user)
+    return {user.pk}
+
+def visible_chamados_for(user, base_qs):
+    """
+    Restringe 'base_qs' aos chamados visíveis pelo usuário.
+    - Admin (perfil) ou superuser: tudo
+    - Gestor: dele + equipe (mesma gestao ou grupo GESTAO_<gestao>)
+    - Colaborador: apenas dele
+    """
+    ids = solicitantes_visiveis(user)
+    if ids is None:
+        return base_qs
+    if not ids:
+        return base_qs.none()
+    if len(ids) == 1:
+        return base_qs.filter(solicitante_id=next(iter(ids)))
+    return base_qs.filter(solicitante_id__in=ids)
 
 # ----------------- helpers -----------------
 def _is_assigned_to_me(user, ch) -> bool:
@@ -111,7 +149,7 @@ def _eh_admin(user):
         return True
 
     # grupos que você já usa no _is_adminish
-    if user.groups.filter(name__in=["Administrativo", "Atendimento", "Gestor", "Suporte"]).exists():
+    if get_principal(user).tem_grupo("Administrativo", "Atendimento", "Gestor", "Suporte"):
         return True
 
     return False
@@ -152,12 +190,13 @@ def _is_adminish(user):
         return False
     if getattr(user, "is_superuser", False) or getattr(user, "is_staff", False):
         return True
-    if user.groups.filter(name__in=["Administrativo", "Atendimento", "Gestor", "Suporte"]).exists():
+    principal = get_principal(user)  # grupos/permissões: 1x por request
+    if principal.tem_grupo("Administrativo", "Atendimento", "Gestor", "Suporte"):
         return True
     perfil_val = str(getattr(user, "perfil", "") or "").strip().lower()
     if perfil_val in {"admin", "administrativo", "gestor", "atendimento", "suporte"}:
         return True
-    if user.has_perm("solicitacoes.change_chamado"):
+    if principal.pode_alterar_chamado:
         return True
     return False
 
@@ -170,25 +209,36 @@ def admin_required(view_func):
     return _wrapped
 
 def _pode_ver(user, chamado):
+    # compara pelos ids: não carrega solicitante/atendente só para isso
+    uid = getattr(user, "pk", None)
     return (
         _is_adminish(user)
-        or user == getattr(chamado, "solicitante", None)
-        or user == getattr(chamado, "atendente", None)
+        or (uid is not None and uid == getattr(chamado, "solicitante_id", None))
+        or (uid is not None and uid == getattr(chamado, "atendente_id", None))
     )
 
-def _updated_filter(qs, last_seen):
-    try:
-        return qs.filter(**{f"{UPDATED_FIELD}__gt": last_seen})
-    except Exception:
-        return qs.filter(criado_em__gt=last_seen)
+class _ContadoPaginator(Paginator):
+    """Paginator que reaproveita um total já conhecido (evita o COUNT extra)."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._total_conhecido = count
 
-def _last_seen(user, secao: str):
-    epoch = timezone.make_aware(timezone.datetime(1970, 1, 1))
-    obj, _ = SecaoVista.objects.get_or_create(user=user, secao=secao, defaults={"last_seen": epoch})
-    return obj.last_seen
+    @cached_property
+    def count(self):
+        return self._total_conhecido
 
-def _paginar(qs, per_page, page_param, request):
-    paginator = Paginator(qs, per_page)
+def _paginar(qs, per_page, page_param, request, count=None):
+    # padrão: cursor (keyset) da seção (pg_a -> cur_a, pg_and -> cur_and, ...);
+    # OFFSET só quando a querystring pede uma página numerada (links antigos)
+    if page_param not in request.GET:
+        cursor_param = page_param.replace("pg_", "cur_", 1)
+        return KeysetPaginator(qs, per_page, count=count).page(request.GET.get(cursor_param))
+
+    if count is None:
+        paginator = Paginator(qs, per_page)
+    else:
+        paginator = _ContadoPaginator(qs, per_page, count)
     try:
         page_number = int(request.GET.get(page_param) or 1)
     except (TypeError, ValueError):
@@ -200,7 +250,8 @@ def _paginar(qs, per_page, page_param, request):
 
 def _encode_filters_without_pages(request):
     qs = request.GET.copy()
-    for k in ["pg_a", "pg_and", "pg_sus", "pg_con", "pg_can"]:
+    for k in ["pg_a", "pg_and", "pg_sus", "pg_con", "pg_can",
+              "cur_a", "cur_and", "cur_sus", "cur_con", "cur_can"]:
         qs.pop(k, None)
     return urlencode(qs, doseq=True)
 
@@ -309,34 +360,25 @@ def meus_chamados(request):
     )
     qs_preservada = _encode_filters_without_pages(request)
 
+    # totais e "novos" de todas as seções numa única query
+    counts, novos = contar_secoes(qs_base, user=request.user)
+
     context = {
         "form_tipo": NovaSolicitacaoTipoForm(user=request.user),
 
-        "counts": {
-            "abertos": abertos_qs.count(),
-            "andamento": andamento_qs.count(),
-            "suspensos": suspensos_qs.count(),
-            "concluidos": concluidos_qs.count(),
-            "cancelados": cancelados_qs.count(),
-        },
+        "counts": counts,
 
-        "abertos":    _paginar(abertos_qs,    ps_a,   "pg_a",   request),
-        "andamento":  _paginar(andamento_qs,  ps_and, "pg_and", request),
-        "suspensos":  _paginar(suspensos_qs,  ps_sus, "pg_sus", request),
-        "concluidos": _paginar(concluidos_qs, ps_con, "pg_con", request),
-        "cancelados": _paginar(cancelados_qs, ps_can, "pg_can", request),
+        "abertos":    _paginar(abertos_qs,    ps_a,   "pg_a",   request, counts["abertos"]),
+        "andamento":  _paginar(andamento_qs,  ps_and, "pg_and", request, counts["andamento"]),
+        "suspensos":  _paginar(suspensos_qs,  ps_sus, "pg_sus", request, counts["suspensos"]),
+        "concluidos": _paginar(concluidos_qs, ps_con, "pg_con", request, counts["concluidos"]),
+        "cancelados": _paginar(cancelados_qs, ps_can, "pg_can", request, counts["cancelados"]),
 
         "ps_a": ps_a, "ps_and": ps_and, "ps_sus": ps_sus, "ps_con": ps_con, "ps_can": ps_can,
         "qs_a": qs_preservada, "qs_and": qs_preservada, "qs_sus": qs_preservada,
         "qs_con": qs_preservada, "qs_can": qs_preservada,
 
-        "novos": {
-            "abertos":    _updated_filter(abertos_qs,    _last_seen(request.user, "abertos")).count(),
-            "andamento":  _updated_filter(andamento_qs,  _last_seen(request.user, "andamento")).count(),
-            "suspensos":  _updated_filter(suspensos_qs,  _last_seen(request.user, "suspensos")).count(),
-            "concluidos": _updated_filter(concluidos_qs, _last_seen(request.user, "concluidos")).count(),
-            "cancelados": _updated_filter(cancelados_qs, _last_seen(request.user, "cancelados")).count(),
-        },
+        "novos": novos,
     }
     return render(request, "solicitacoes/meus_chamados.html", context)
 
@@ -363,38 +405,16 @@ def nova_solicitacao(request):
     form_tmp = NovaSolicitacaoTipoForm(user=request.user)
     tipo = get_object_or_404(form_tmp.fields["tipo"].queryset, pk=tipo_id, ativo=True)
 
-    # 2) Tudo-ou-nada
-    with transaction.atomic():
-        chamado = Chamado.objects.create(
-            solicitante=request.user, tipo=tipo, status=Chamado.Status.ABERTO,
-        )
-
-        perguntas = tipo.perguntas.filter(ativa=True).order_by("ordem", "id")
-        for p in perguntas:
-            nome_base = f"pergunta_{p.id}"
-            if p.tipo_campo == PerguntaTipoSolicitacao.TipoCampo.MULTIESCOLHA:
-                valores = request.POST.getlist(nome_base)
-                valor_texto = ";".join(v.strip() for v in valores if v.strip())
-            elif p.tipo_campo == PerguntaTipoSolicitacao.TipoCampo.BOOLEANO:
-                valor_texto = "true" if request.POST.get(nome_base) == "true" else "false"
-            else:
-                valor_texto = (request.POST.get(nome_base, "") or "").strip()
-
-            valor_arquivo = None
-            if p.tipo_campo == PerguntaTipoSolicitacao.TipoCampo.ARQUIVO and (nome_base + "_file") in request.FILES:
-                valor_arquivo = request.FILES.get(nome_base + "_file")
-
-            # Validação de obrigatórias (rollback implícito por transaction.atomic)
-            if p.obrigatoria and p.tipo_campo != PerguntaTipoSolicitacao.TipoCampo.ARQUIVO and not valor_texto:
-                # libera o cadeado para o usuário poder reenviar após erro
-                if cache_key:
-                    cache.delete(cache_key)
-                messages.error(request, f'A pergunta "{p.texto}" é obrigatória.')
-                return redirect("solicitacoes:meus_chamados")
-
-            RespostaChamado.objects.create(
-                chamado=chamado, pergunta=p, valor_texto=valor_texto, valor_arquivo=valor_arquivo
-            )
+    # 2) Respostas validadas contra o schema em cache; 3) chamado + respostas em lote
+    try:
+        respostas = coletar_respostas(schema_do_tipo(tipo.pk), request.POST, request.FILES)
+        chamado = abrir_chamado(request.user, tipo, respostas)
+    except ValidationError as e:
+        # libera o cadeado para o usuário poder reenviar após erro
+        if cache_key:
+            cache.delete(cache_key)
+        messages.error(request, e.messages[0])
+        return redirect("solicitacoes:meus_chamados")
 
     # (opcional) marca a chave como concluída por mais tempo
     if cache_key:
@@ -408,7 +428,7 @@ def nova_solicitacao(request):
 def form_campos_por_tipo(request, tipo_id):
     form_tmp = NovaSolicitacaoTipoForm(user=request.user)
     tipo = get_object_or_404(form_tmp.fields["tipo"].queryset, pk=tipo_id, ativo=True)
-    perguntas = tipo.perguntas.filter(ativa=True).order_by("ordem", "id")
+    perguntas = schema_do_tipo(tipo.pk).perguntas_ativas  # schema em cache (sem query de perguntas)
     return render(request, "solicitacoes/_campos_perguntas.html", {"tipo": tipo, "perguntas": perguntas})
 
 @login_required
@@ -457,18 +477,9 @@ def marcar_secao_vista(request):
     SECOES_OK = {"abertos", "andamento", "suspensos", "concluidos", "cancelados"}
     if secao not in SECOES_OK:
         return HttpResponseBadRequest("secao inválida")
-    for tentativa in range(5):
-        try:
-            with transaction.atomic():
-                SecaoVista.objects.update_or_create(
-                    user=request.user, secao=secao, defaults={"last_seen": timezone.now()},
-                )
-            return JsonResponse({"ok": True})
-        except OperationalError as e:
-            if "locked" in str(e).lower() and tentativa < 4:
-                time.sleep(0.1 * (tentativa + 1))
-                continue
-            raise
+    registrar_secao_vista(request.user, secao)
+    return JsonResponse({"ok": True})
+
 # ----------------- Gerenciar Chamados (Administrativo) -----------------
 @admin_required
 def gerenciar_chamados(request):
@@ -518,11 +529,14 @@ def gerenciar_chamados(request):
     ps_con = _ps("ps_con", 2)
     ps_can = _ps("ps_can", 2)
 
-    abertos_page    = _paginar(qs_base.filter(status=Chamado.Status.ABERTO),       ps_a,   "pg_a",   request)
-    andamento_page  = _paginar(qs_base.filter(status=Chamado.Status.EM_ANDAMENTO), ps_and, "pg_and", request)
-    suspensos_page  = _paginar(qs_base.filter(status=Chamado.Status.SUSPENSO),     ps_sus, "pg_sus", request)
-    concluidos_page = _paginar(qs_base.filter(status=Chamado.Status.CONCLUIDO),    ps_con, "pg_con", request)
-    cancelados_page = _paginar(qs_base.filter(status=Chamado.Status.CANCELADO),    ps_can, "pg_can", request)
+    # totais e "novos" de todas as seções numa única query
+    counts, novos = contar_secoes(qs_base, user=request.user)
+
+    abertos_page    = _paginar(qs_base.filter(status=Chamado.Status.ABERTO),       ps_a,   "pg_a",   request, counts["abertos"])
+    andamento_page  = _paginar(qs_base.filter(status=Chamado.Status.EM_ANDAMENTO), ps_and, "pg_and", request, counts["andamento"])
+    suspensos_page  = _paginar(qs_base.filter(status=Chamado.Status.SUSPENSO),     ps_sus, "pg_sus", request, counts["suspensos"])
+    concluidos_page = _paginar(qs_base.filter(status=Chamado.Status.CONCLUIDO),    ps_con, "pg_con", request, counts["concluidos"])
+    cancelados_page = _paginar(qs_base.filter(status=Chamado.Status.CANCELADO),    ps_can, "pg_can", request, counts["cancelados"])
 
     # --- quem pode reabrir suspensos (já existia) ---
     can_reopen = _is_adminish(request.user)
@@ -550,6 +564,9 @@ def gerenciar_chamados(request):
         "concluidos": concluidos_page,
         "cancelados": cancelados_page,
 
+        "counts": counts,
+        "novos": novos,
+
         "ps_a": ps_a, "ps_and": ps_and, "ps_sus": ps_sus, "ps_con": ps_con, "ps_can": ps_can,
         "qs_a": qs_preservada, "qs_and": qs_preservada, "qs_sus": qs_preservada,
         "qs_con": qs_preservada, "qs_can": qs_preservada,
@@ -736,59 +753,103 @@ def chamado_abertura_partial(request, pk):
     respostas = chamado.respostas.select_related("pergunta").all()
     return render(request, "solicitacoes/partials/_abertura.html", {"chamado": chamado, "respostas": respostas})
 
+def _json_mensagens(request, chamado, mensagens, **extra):
+    """Fragmento HTML + cursores de um lote de mensagens (endpoint incremental/envio)."""
+    html = render_to_string(
+        "solicitacoes/partials/_mensagens.html", {"chamado": chamado, "mensagens": mensagens}, request=request
+    )
+    return JsonResponse({
+        "html": html,
+        "quantidade": len(mensagens),
+        "cursor_inicio": cursor_mensagem(mensagens[0] if mensagens else None),
+        "cursor_fim": cursor_mensagem(mensagens[-1] if mensagens else None),
+        **extra,
+    })
+
 @login_required
 def chamado_mensagens_partial(request, pk):
     chamado = get_object_or_404(Chamado, pk=pk)
     if not _pode_ver(request.user, chamado):
         return HttpResponseForbidden()
 
-    qs = ChamadoMensagem.objects.filter(chamado=chamado).select_related("autor").order_by("criado_em")
-    if not _is_adminish(request.user):
-        vis_publica = getattr(ChamadoMensagem, "PUBLICA", "publica")
-        qs = qs.filter(visibilidade=vis_publica)
-
-    return render(request, "solicitacoes/partials/_conversa.html", {"chamado": chamado, "mensagens": qs})
+    # só a página mais recente; anteriores/novas via chamado_mensagens_novas
+    qs = mensagens_visiveis(chamado, _is_adminish(request.user))
+    mensagens, tem_mais = mensagens_antes(qs)
+    return render(request, "solicitacoes/partials/_conversa.html", {
+        "chamado": chamado,
+        "mensagens": mensagens,
+        "tem_mais": tem_mais,
+        "cursor_inicio": cursor_mensagem(mensagens[0] if mensagens else None),
+        "cursor_fim": cursor_mensagem(mensagens[-1] if mensagens else None),
+    })
 
 @login_required
-def chamado_enviar_mensagem(request, pk):
+@require_GET
+def chamado_mensagens_novas(request, pk):
+    """
+    Conversa incremental (JSON com fragmento HTML):
+      ?after=<cursor>  -> só as mensagens posteriores ao cursor
+      ?before=<cursor> -> página anterior ao cursor (rolagem para cima)
+    """
     chamado = get_object_or_404(Chamado, pk=pk)
     if not _pode_ver(request.user, chamado):
         return HttpResponseForbidden()
 
-    if request.method == "POST":
-        files = request.FILES.copy()
-        if "anexo" not in files and "arquivo" in files:
-            files["anexo"] = files["arquivo"]
+    qs = mensagens_visiveis(chamado, _is_adminish(request.user))
+    if "before" in request.GET:
+        cursor = ler_cursor(request.GET["before"])
+        if cursor is None:
+            return HttpResponseBadRequest("cursor inválido")
+        mensagens, tem_mais = mensagens_antes(qs, cursor)
+        return _json_mensagens(request, chamado, mensagens, tem_mais=tem_mais)
 
-        form = ChamadoMensagemForm(request.POST, files)
-        if form.is_valid():
-            msg = form.save(commit=False)
-            msg.chamado = chamado
-            msg.autor = request.user
-            if not _is_adminish(request.user):
-                msg.visibilidade = getattr(ChamadoMensagem, "PUBLICA", "publica")
-            elif not getattr(msg, "visibilidade", None):
-                msg.visibilidade = getattr(ChamadoMensagem, "PUBLICA", "publica")
-            msg.save()
-        else:
-            html = render(
-                request, "solicitacoes/partials/_conversa.html",
-                {"chamado": chamado, "mensagens": ChamadoMensagem.objects.filter(chamado=chamado).order_by("criado_em")}
-            ).content.decode("utf-8")
-            from django.utils.html import escape
-            erros = escape(form.errors.as_json())
-            html = html.replace(
-                'id="conversa-erros" class="text-danger small mt-2 d-none"',
-                'id="conversa-erros" class="text-danger small mt-2"'
-            ).replace(
-                '</form>',
-                f'<div class="text-danger small mt-2">{erros}</div></form>'
-            )
-            return HttpResponse(html)
-
-        return chamado_mensagens_partial(request, pk)
-
-    return redirect("solicitacoes:chamado_tratativa", pk=pk)
+    cursor = ler_cursor(request.GET.get("after"))
+    if cursor is None:
+        return HttpResponseBadRequest("cursor inválido")
+    return _json_mensagens(request, chamado, mensagens_depois(qs, cursor))
+
+@login_required
+def chamado_enviar_mensagem(request, pk):
+    """
+    Envia uma mensagem. Via AJAX (?ajax=1) responde como chamado_mensagens_novas:
+    só as mensagens após o cursor 'after' do cliente (inclui a enviada), ou
+    400 com os erros do form. Sem AJAX, volta para a tela do chamado.
+    """
+    chamado = get_object_or_404(Chamado, pk=pk)
+    if not _pode_ver(request.user, chamado):
+        return HttpResponseForbidden()
+    if request.method != "POST":
+        return redirect("solicitacoes:chamado_tratativa", pk=pk)
+    is_admin = _is_adminish(request.user)
+    ajax = request.GET.get("ajax") == "1"
+
+    files = request.FILES.copy()
+    if "anexo" not in files and "arquivo" in files:
+        files["anexo"] = files["arquivo"]
+
+    form = ChamadoMensagemForm(request.POST, files)
+    if not form.is_valid():
+        if ajax:
+            return JsonResponse({"erros": form.errors.get_json_data()}, status=400)
+        messages.error(request, "Não foi possível enviar a mensagem.")
+        return redirect("solicitacoes:chamado_tratativa", pk=pk)
+
+    msg = form.save(commit=False)
+    msg.chamado = chamado
+    msg.autor = request.user
+    if not is_admin or not getattr(msg, "visibilidade", None):
+        msg.visibilidade = ChamadoMensagem.PUBLICA
+    msg.save()
+
+    if not ajax:
+        return redirect("solicitacoes:chamado_tratativa", pk=pk)
+    qs = mensagens_visiveis(chamado, is_admin)
+    cursor = ler_cursor(request.POST.get("after"))
+    if cursor is None:
+        # cliente sem cursor (conversa vazia): devolve a página mais recente
+        mensagens, _ = mensagens_antes(qs)
+        return _json_mensagens(request, chamado, mensagens)
+    return _json_mensagens(request, chamado, mensagens_depois(qs, cursor))
 
 # ----------------- “Abertos” como parcial (usado por HTMX/refresh) -----------------
 
@@ -852,9 +913,7 @@ def marcar_conversa_vista(request, pk):
     chamado = get_object_or_404(Chamado, pk=pk)
     if not _pode_ver(request.user, chamado):
         return HttpResponseForbidden()
-    ChamadoVista.objects.update_or_create(
-        user=request.user, chamado=chamado, defaults={"last_seen": timezone.now()}
-    )
+    registrar_chamados_vistos(request.user, [chamado.pk])
     return JsonResponse({"ok": True})
 
 @login_required
@@ -874,10 +933,7 @@ def api_novas_mensagens(request):
     if not ids:
         return JsonResponse({})
 
-    vistas = dict(
-        ChamadoVista.objects.filter(user=request.user, chamado_id__in=ids)
-        .values_list("chamado_id", "last_seen")
-    )
+    vistas = ultimas_vistas_chamados(request.user, ids)
 
     rows = (
         ChamadoMensagem.objects.filter(chamado_id__in=ids, visibilidade=ChamadoMensagem.PUBLICA)
@@ -911,11 +967,7 @@ def atendimento_seen(request):
     if not ids:
         return JsonResponse({"ok": True, "count": 0})
 
-    now = timezone.now()
-    for cid in ids:
-        ChamadoVista.objects.update_or_create(
-            user=request.user, chamado_id=cid, defaults={"last_seen": now}
-        )
+    registrar_chamados_vistos(request.user, ids)
     return JsonResponse({"ok": True, "count": len(ids)})
 
 @login_required
@@ -937,20 +989,8 @@ def marcar_chamados_vistos(request):
     if not ids:
         return JsonResponse({"ok": True})
 
-    agora = timezone.now()
-    for tentativa in range(5):
-        try:
-            with transaction.atomic():
-                for cid in ids:
-                    ChamadoVista.objects.update_or_create(
-                        user=request.user, chamado_id=cid, defaults={"last_seen": agora},
-                    )
-            return JsonResponse({"ok": True})
-        except OperationalError as e:
-            if "locked" in str(e).lower() and tentativa < 4:
-                time.sleep(0.1 * (tentativa + 1))
-                continue
-            raise
+    registrar_chamados_vistos(request.user, ids)
+    return JsonResponse({"ok": True})
 
 
 
@@ -971,11 +1011,7 @@ def _seen_alias(request):
     if not ids:
         return JsonResponse({"ok": True, "count": 0})
 
-    now = timezone.now()
-    for cid in ids:
-        ChamadoVista.objects.update_or_create(
-            user=request.user, chamado_id=cid, defaults={"last_seen": now}
-        )
+    registrar_chamados_vistos(request.user, ids)
     return JsonResponse({"ok": True, "count": len(ids)})
 
 
@@ -1004,58 +1040,15 @@ from django.db.models import Count, Q
 from .models import Chamado
 
 
-def _count_status(qs, *member_names: str) -> int:
-    """
-    Conta itens por status, aceitando múltiplos nomes de membro do Enum/Choices.
-    Ex.: _count_status(qs, "ANDAMENTO", "EM_ANDAMENTO")
-    """
-    vals = []
-    for name in member_names:
-        val = getattr(Chamado.Status, name, None)
-        if val is not None:
-            vals.append(val)
-    return qs.filter(status__in=vals).count() if vals else 0
-
-
-
-
 @login_required
 def dashboard_data(request):
     user = request.user
 
     # aplica a regra de visibilidade (admin/superuser = tudo,
-    # gestor = time + próprios, colaborador = próprios)
-    base_qs = Chamado.objects.select_related("tipo", "solicitante")
-    qs = visible_chamados_for(user, base_qs)
-
-    # métricas por status
-    abertos      = qs.filter(status=Chamado.Status.ABERTO).count()
-    andamento    = qs.filter(status=Chamado.Status.EM_ANDAMENTO).count()
-    suspensos    = qs.filter(status=Chamado.Status.SUSPENSO).count()
-    concluidos   = qs.filter(status=Chamado.Status.CONCLUIDO).count()
-    cancelados   = qs.filter(status=Chamado.Status.CANCELADO).count()
-    total        = qs.count()
-
-    # top 5 tipos
-    top_tipos_qs = (
-        qs.values("tipo__nome")
-          .annotate(qtd=Count("id"))
-          .order_by("-qtd")[:5]
-    )
-    data = {
-        "cards": {
-            "total": total,
-            "abertos": abertos,
-            "andamento": andamento,
-            "suspensos": suspensos,
-            "concluidos": concluidos,
-            "cancelados": cancelados,
-        },
-        "top_tipos": {
-            "labels": [(row["tipo__nome"] or "Sem tipo") for row in top_tipos_qs],
-            "values": [row["qtd"] for row in top_tipos_qs],
-        },
-    }
+    # gestor = time + próprios, colaborador = próprios) sobre o rollup
+    # materializado (ChamadoRollup): custo não depende do tamanho da tabela de chamados.
+    # Cache por escopo: admins (e gestores da mesma equipe) compartilham a resposta.
+    data = dados_dashboard_cache(solicitantes_visiveis(user))
     return JsonResponse(data)
 
 
@@ -1146,55 +1139,8 @@ def chamado_modal(request, pk: int):
     except Chamado.DoesNotExist:
         raise Http404("Chamado não encontrado")
 
-    # ---- Normaliza Perguntas & Respostas em uma lista "qa" ----
-    qa = []
-
-    def _get(obj, *names):
-        """Tenta pegar o primeiro atributo existente/não vazio de obj."""
-        for n in names:
-            if hasattr(obj, n):
-                val = getattr(obj, n)
-                if callable(val):
-                    try:
-                        val = val()
-                    except Exception:
-                        pass
-                if val not in (None, ""):
-                    return val
-        return None
-
-    # tenta detectar o related das respostas (um dos nomes abaixo)
-    related_names = [
-        "respostas",                # se você nomeou assim
-        "respostas_chamado",        # variação comum
-        "respostachamado_set",      # nome reverso padrão do Django
-        "respostaset",              # só por precaução
-    ]
-
-    resp_qs = None
-    for rel in related_names:
-        if hasattr(ch, rel):
-            try:
-                resp_qs = getattr(ch, rel).all()
-            except Exception:
-                resp_qs = None
-            if resp_qs is not None:
-                break
-
-    if resp_qs:
-        for r in resp_qs:
-            # Pega o objeto da pergunta em diferentes nomes possíveis
-            p = _get(r,
-                     "pergunta", "pergunta_tipo", "pergunta_tiposolicitacao",
-                     "pergunta_tipo_solicitacao", "pergunta_obj")
-
-            # Texto da pergunta (tentando vários campos típicos)
-            q_txt = _get(p, "titulo", "texto", "label", "nome", "descricao", "descricao_curta") or "Pergunta"
-
-            # Valor/resposta em diferentes campos
-            a_txt = _get(r, "valor", "resposta", "texto", "valor_texto", "conteudo") or "—"
-
-            qa.append({"q": q_txt, "a": a_txt})
+    # ---- Perguntas & Respostas: schema compilado do tipo (cache) + 1 query de respostas ----
+    qa = qa_chamado(ch)
 
     html = render_to_string(
         "solicitacoes/_chamado_modal.html",
@@ -1216,94 +1162,41 @@ admin_report_required = user_passes_test(_is_gestor_or_superuser)
 
 @admin_report_required
 def relatorio_solicitacoes(request):
-    # ----- Base Query
-    qs = (
-        Chamado.objects
-        .select_related("tipo", "solicitante")
-        .order_by("-criado_em")
-    )
-
-    # ----- Filtros
-    q = (request.GET.get("q") or "").strip()            # ID ou solicitante
-    tipo = (request.GET.get("tipo") or "").strip()      # tipo_id
-    status = (request.GET.get("status") or "").strip()  # código do status
-    de = (request.GET.get("de") or "").strip()          # YYYY-MM-DD
-    ate = (request.GET.get("ate") or "").strip()        # YYYY-MM-DD
-
-    # q: número -> ID; texto -> campos do solicitante
-    if q:
-        if q.isdigit():
-            qs = qs.filter(id=int(q))
-        else:
-            UserModel = get_user_model()
-            user_fields = {f.name for f in UserModel._meta.get_fields() if hasattr(f, "name")}
-            qf = (
-                Q(solicitante__username__icontains=q) |
-                Q(solicitante__first_name__icontains=q) |
-                Q(solicitante__last_name__icontains=q)
-            )
-            if "nome_completo" in user_fields:
-                qf |= Q(solicitante__nome_completo__icontains=q)
-            qs = qs.filter(qf)
+    # ----- Base Query + Filtros (q: ID ou solicitante, tipo, status, de/ate)
+    filtros = filtros_relatorio(request.GET)
+    qs = relatorio_queryset(filtros)
 
-    if tipo:
-        qs = qs.filter(tipo_id=tipo)
-
-    if status:
-        qs = qs.filter(status=status)
-
-    # período por data de criação
-    def _parse_d(dstr):
-        try:
-            return date.fromisoformat(dstr)
-        except Exception:
-            return None
-
-    d_de = _parse_d(de)
-    d_ate = _parse_d(ate)
-    if d_de:
-        qs = qs.filter(criado_em__date__gte=d_de)
-    if d_ate:
-        qs = qs.filter(criado_em__date__lte=d_ate)
-
-    # ----- Exportar Excel (respeitando filtros)
+    # ----- Exportar Excel/CSV (respeitando filtros), em streaming
     export = (request.GET.get("export") or "").lower()
     can_export = _is_gestor_or_superuser(request.user)
+    com_respostas = request.GET.get("respostas") == "1"  # uma coluna por pergunta
+    if export == "csv" and can_export:
+        cabecalho, linhas = dados_exportacao(qs, com_respostas)
+        resp = StreamingHttpResponse(csv_stream(cabecalho, linhas), content_type="text/csv; charset=utf-8")
+        resp["Content-Disposition"] = 'attachment; filename="relatorio-solicitacoes.csv"'
+        return resp
     if export == "xlsx" and can_export:
         try:
-            from openpyxl import Workbook
+            import openpyxl  # noqa: F401
         except Exception:
             return HttpResponseBadRequest("Exportação indisponível: instale 'openpyxl'.")
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Solicitações"
-
-        # Cabeçalho
-        ws.append(["ID", "Solicitante", "Tipo", "Status", "Criado em"])
-
-        # Linhas (sem paginação)
-        for c in qs.iterator():
-            solicitante_str = str(c.solicitante) if c.solicitante else ""
-            tipo_str = c.tipo.nome if getattr(c, "tipo", None) else ""
-            status_str = c.get_status_display() if hasattr(c, "get_status_display") else c.status
-            criado_str = c.criado_em.strftime("%d/%m/%Y %H:%M") if getattr(c, "criado_em", None) else ""
-            ws.append([c.id, solicitante_str, tipo_str, status_str, criado_str])
-
-        bio = BytesIO()
-        wb.save(bio)
-        bio.seek(0)
-        resp = HttpResponse(
-            bio.read(),
+        cabecalho, linhas = dados_exportacao(qs, com_respostas)
+        return FileResponse(
+            xlsx_temporario(cabecalho, linhas),
+            as_attachment=True,
+            filename="relatorio-solicitacoes.xlsx",
             content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
-        resp["Content-Disposition"] = 'attachment; filename="relatorio-solicitacoes.xlsx"'
-        return resp
 
     # ----- Paginação
-    paginator = Paginator(qs, 50)
-    page_number = request.GET.get("page") or 1
-    page_obj = paginator.get_page(page_number)
+    # padrão: cursor (keyset) + total estimado; '?page=N' mantém o modo antigo (OFFSET)
+    if "page" in request.GET:
+        paginator = Paginator(qs, 50)
+        page_obj = paginator.get_page(request.GET.get("page") or 1)
+    else:
+        paginator = KeysetPaginator(qs, 50)
+        page_obj = paginator.page(request.GET.get("cursor"))
 
     # Opções do select de tipo
     tipos = (
@@ -1320,170 +1213,130 @@ def relatorio_solicitacoes(request):
     # Querystring sem 'page' p/ paginação e export
     params = request.GET.copy()
     params.pop("page", None)
+    params.pop("cursor", None)
     qs_keep = params.urlencode()
 
     ctx = {
         "page_obj": page_obj,
+        "sla": metricas_relatorio_cache(filtros, qs),  # médias de SLA dos filtrados (cache por versão)
         "total": paginator.count,
+        "total_estimado": getattr(page_obj, "is_keyset", False),
         "tipos": tipos,
         "status_choices": status_choices,
-        "filters": {"q": q, "tipo": tipo, "status": status, "de": de, "ate": ate},
+        "filters": filtros,
+        "com_respostas": com_respostas,
         "can_export": can_export,
         "qs_keep": qs_keep,
     }
     return render(request, "solicitacoes/relatorio.html", ctx)
 
 
+# ----- Exportação em segundo plano (jobs) -----
 
+def _exportacao_json(job):
+    data = {
+        "id": job.pk,
+        "status": job.status,
+        "formato": job.formato,
+        "processadas": job.processadas,
+        "total": job.total,
+        "percentual": job.percentual,
+        "erro": job.erro,
+        "status_url": reverse("solicitacoes:relatorio_exportacao_status", args=[job.pk]),
+    }
+    if job.status == ExportacaoRelatorio.Status.CONCLUIDO and job.arquivo:
+        data["download_url"] = reverse("solicitacoes:relatorio_exportacao_download", args=[job.pk])
+    return data
 
-# ... seus outros imports
+@admin_report_required
+@require_POST
+def relatorio_exportar(request):
+    """
+    POST /solicitacoes/relatorio/exportar/ (filtros do relatório + formato=xlsx|csv [+ respostas=1])
+    Cria (ou reaproveita) o job; o progresso é consultado em status_url.
+    """
+    formato = (request.POST.get("formato") or "xlsx").lower()
+    if formato not in ExportacaoRelatorio.Formato.values:
+        return HttpResponseBadRequest("formato inválido")
+    job = solicitar_exportacao(
+        request.user, filtros_relatorio(request.POST), formato,
+        com_respostas=request.POST.get("respostas") == "1",
+    )
+    return JsonResponse(_exportacao_json(job), status=201)
 
-@login_required
 @admin_report_required
 @require_GET
-def relatorio_chamado_modal(request, pk: int):
-    chamado = get_object_or_404(
-        Chamado.objects.select_related("tipo", "solicitante"),
-        pk=pk,
-    )
+def relatorio_exportacao_status(request, pk):
+    job = get_object_or_404(ExportacaoRelatorio, pk=pk)
+    return JsonResponse(_exportacao_json(job))
 
-    # --- Respostas de abertura
-    respostas_qs = list(
-        RespostaChamado.objects.select_related("pergunta")
-        .filter(chamado=chamado)
-        .order_by("id")
+@admin_report_required
+@require_GET
+def relatorio_exportacao_download(request, pk):
+    job = get_object_or_404(ExportacaoRelatorio, pk=pk)
+    if job.status != ExportacaoRelatorio.Status.CONCLUIDO or not job.arquivo:
+        raise Http404("Exportação ainda não está pronta.")
+    # lido pelo storage configurado (local ou remoto)
+    return FileResponse(
+        job.arquivo.open("rb"),
+        as_attachment=True,
+        filename=f"relatorio-solicitacoes.{job.formato}",
     )
 
-    def _as_text_generic(resp):
-        """
-        Procura em campos concretos (Char/Text/JSON) e retorna a
-        primeira string não vazia. Ignora FKs/arquivos.
-        NUNCA cai no __str__ do model (evita repetir a pergunta).
-        """
-        # Campos que não são conteúdo de resposta
-        blacklist = {
-            "id", "pk",
-            "chamado", "chamado_id",
-            "pergunta", "pergunta_id",
-            "criado_em", "atualizado_em",
-            "created", "updated", "modificado_em",
-            "autor", "autor_id",
-            "arquivo", "arquivos", "file", "files", "anexo", "anexos",
-        }
-
-        # Percorre apenas campos "concretos"
-        for f in getattr(resp._meta, "fields", []):
-            name = getattr(f, "name", "")
-            if not name or name in blacklist:
-                continue
-
-            # ignora relações
-            if getattr(f, "is_relation", False):
-                continue
-
-            try:
-                v = getattr(resp, name)
-            except Exception:
-                continue
 
-            if v in (None, ""):
-                continue
 
-            # ignora arquivo/FieldFile
-            if hasattr(v, "url") or hasattr(v, "file"):
-                continue
 
-            # coleções/JSON
-            if isinstance(v, (list, tuple)):
-                s = "\n".join(str(x) for x in v).strip()
-                if s:
-                    return s
-            elif isinstance(v, dict):
-                s = "\n".join(
-                    f"{k}: {vv}"
-                    for k, vv in v.items()
-                    if str(k).lower() not in ("anexo", "arquivo", "arquivos", "file", "files")
-                ).strip()
-                if s:
-                    return s
-            else:
-                s = str(v).strip()
-                if s:
-                    return s
-
-        # nada encontrado
-        return ""
-
-    # Mapa pergunta_id -> lista de textos
-    respostas_map = {}
-    for r in respostas_qs:
-        pid = getattr(r, "pergunta_id", None) or (getattr(r, "pergunta", None).pk if getattr(r, "pergunta", None) else None)
-        if not pid:
-            continue
-        txt = _as_text_generic(r)
-        if txt:
-            respostas_map.setdefault(pid, []).append(txt)
+# ... seus outros imports
 
-    # --- Perguntas do tipo
-    perguntas = list(
-        PerguntaTipoSolicitacao.objects.filter(tipo=chamado.tipo).order_by("id")
+@login_required
+@admin_report_required
+@require_GET
+def relatorio_chamado_modal(request, pk: int):
+    chamado = get_object_or_404(
+        Chamado.objects.select_related("tipo", "solicitante"),
+        pk=pk,
     )
 
-    qa_rows = []
-    for p in perguntas:
-        label = getattr(p, "nome", None) or getattr(p, "titulo", None) or str(p)
-        lcl = (label or "").lower()
-
-        # oculta perguntas de anexo
-        if "anexo" in lcl:
-            continue
-
-        pid = getattr(p, "id", None)
-        val = "\n".join(respostas_map.get(pid, [])) if pid else ""
-
-        # fallbacks do próprio Chamado
-        if not val:
-            if "nome" in lcl and ("solicita" in lcl or "daria" in lcl):
-                for attr in ("titulo", "nome", "assunto", "nome_solicitacao"):
-                    v = getattr(chamado, attr, None)
-                    if v and str(v).strip():
-                        val = str(v).strip()
-                        break
-            if not val and ("detal" in lcl or "descr" in lcl):
-                for attr in ("detalhamento", "descricao", "descricao_solicitacao", "observacoes", "observacao"):
-                    v = getattr(chamado, attr, None)
-                    if v and str(v).strip():
-                        val = str(v).strip()
-                        break
-
-        qa_rows.append({"label": label, "value": val})
-
-    # Se não houver perguntas, tenta exibir título/detalhamento do Chamado
-    if not qa_rows:
-        def _maybe(label, *attrs):
-            for a in attrs:
-                v = getattr(chamado, a, None)
-                if v and str(v).strip():
-                    qa_rows.append({"label": label, "value": str(v).strip()})
-                    return
-        _maybe("Título / Nome da Solicitação", "titulo", "nome", "assunto", "nome_solicitacao")
-        _maybe("Detalhamento da Solicitação", "detalhamento", "descricao", "descricao_solicitacao")
-
-    # --- Mensagens
-    mensagens = (
-        ChamadoMensagem.objects.filter(chamado=chamado)
-        .select_related("autor")
-        .order_by("criado_em")
-    )
+    # --- Perguntas do tipo + respostas (schema compilado em cache + 1 query)
+    qa_rows = qa_relatorio(chamado)
 
     ctx = {
         "chamado": chamado,
         "qa_rows": qa_rows,
-        "mensagens": mensagens,
+        **_janela_relatorio(request, chamado),  # só as últimas mensagens
     }
     return render(request, "solicitacoes/_relatorio_modal.html", ctx)
 
 
+def _janela_relatorio(request, chamado, cursor=None) -> dict:
+    """Página (keyset) da conversa do modal; compacto (padrão) agrupa eventos de sistema."""
+    compacto = request.GET.get("compacto") != "0"
+    mensagens, tem_mais = mensagens_antes(mensagens_visiveis(chamado, True), cursor, RELATORIO_MENSAGENS)
+    timeline = timeline_compacta(mensagens) if compacto else [{"mensagem": m} for m in mensagens]
+    return {
+        "timeline": timeline,
+        "compacto": compacto,
+        "tem_mais": tem_mais,
+        "cursor_inicio": cursor_mensagem(mensagens[0] if mensagens else None),
+        "cursor_antes": cursor is not None,
+    }
+
+
+@login_required
+@admin_report_required
+@require_GET
+def relatorio_chamado_mensagens(request, pk: int):
+    """Fragmento da conversa do modal: últimas mensagens ou, com ?before=, a página anterior."""
+    chamado = get_object_or_404(Chamado, pk=pk)
+    cursor = None
+    if "before" in request.GET:
+        cursor = ler_cursor(request.GET["before"])
+        if cursor is None:
+            return HttpResponseBadRequest("cursor inválido")
+    ctx = {"chamado": chamado, **_janela_relatorio(request, chamado, cursor)}
+    return render(request, "solicitacoes/_relatorio_mensagens.html", ctx)
+
+
 
 
 # util opcional para limpar arquivos de FileField/ImageField
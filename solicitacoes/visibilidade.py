@@ -0,0 +1,59 @@
+# solicitacoes/visibilidade.py
+"""
+Índice setor -> tipos de solicitação visíveis (TipoSolicitacao.setores_permitidos).
+
+O mapa é montado uma vez por versão (1 query sobre os tipos ativos, já com os
+setores separados) e guardado no cache; a versão muda quando algum tipo é
+salvo/excluído (signals; nos outros workers, expira em settings.CACHE_TTL_CURTO).
+O formulário de nova solicitação só resolve o setor do usuário no mapa, em vez
+de carregar todos os tipos e chamar visivel_para() em cada um.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import TipoSolicitacao
+
+_VERSAO_KEY = "solicitacoes:tipos_setor:versao"
+
+
+def _normalizar_setor(setor) -> str:
+    return (setor or "").strip().lower()  # mesmo critério de visivel_para
+
+
+def invalidar_tipos_visiveis():
+    try:
+        cache.incr(_VERSAO_KEY)
+    except ValueError:
+        cache.set(_VERSAO_KEY, 2, None)
+
+
+def _montar_mapa() -> dict:
+    """{"todos": ids sem restrição, "setores": {setor: ids restritos ao setor}}"""
+    todos, setores = set(), {}
+    for tipo in TipoSolicitacao.objects.filter(ativo=True).only("pk", "ativo", "setores_permitidos"):
+        permitidos = tipo.setores_lista()
+        if not permitidos:
+            todos.add(tipo.pk)
+        for setor in permitidos:
+            setores.setdefault(setor, set()).add(tipo.pk)
+    return {
+        "todos": frozenset(todos),
+        "setores": {setor: frozenset(ids) for setor, ids in setores.items()},
+    }
+
+
+def _mapa() -> dict:
+    versao = cache.get_or_set(_VERSAO_KEY, 1, None)
+    key = f"solicitacoes:tipos_setor:{versao}"
+    mapa = cache.get(key)
+    if mapa is None:
+        mapa = _montar_mapa()
+        cache.set(key, mapa, settings.CACHE_TTL_CURTO)
+    return mapa
+
+
+def tipos_visiveis_ids(user) -> frozenset:
+    """ids dos tipos ativos visíveis para o setor do usuário (equivale a visivel_para)."""
+    mapa = _mapa()
+    setor = _normalizar_setor(getattr(user, "setor", ""))
+    return mapa["todos"] | mapa["setores"].get(setor, frozenset())
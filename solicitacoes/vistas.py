@@ -0,0 +1,200 @@
+# solicitacoes/vistas.py
+"""
+Marcadores de "visto" (ChamadoVista / SecaoVista) com buffer write-behind.
+
+As telas de chamados marcam "visto" a cada abertura/foco de aba. Em vez de um
+write síncrono por chamada, os timestamps ficam num buffer em memória (por
+processo) e são gravados em lote a cada SOLICITACOES_VISTAS_FLUSH_SEGUNDOS
+(upsert_vistas: last_seen só avança). As leituras (ultimas_vistas_chamados,
+secoes_vistas_pendentes) mesclam o buffer, então o badge do próprio usuário
+nunca fica atrasado.
+
+Com SOLICITACOES_VISTAS_FLUSH_SEGUNDOS = 0 a gravação é síncrona (write-through).
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import Chamado, ChamadoVista, SecaoVista
+
+logger = logging.getLogger(__name__)
+
+
+def _intervalo() -> float:
+    return float(getattr(settings, "SOLICITACOES_VISTAS_FLUSH_SEGUNDOS", 5))
+
+
+def _mesclar(destino: dict, origem: dict):
+    """Mantém o maior timestamp por chave."""
+    for chave, quando in origem.items():
+        atual = destino.get(chave)
+        if atual is None or quando > atual:
+            destino[chave] = quando
+
+
+# --- Upsert em lote ---
+
+def upsert_vistas(model, campo: str, linhas: dict) -> int:
+    """
+    Grava {(user_id, chave): quando}: linhas novas num único INSERT ... ON CONFLICT
+    DO NOTHING; as existentes só avançam (UPDATE ... WHERE last_seen < quando),
+    uma query por (usuário, timestamp). Cada processo tem seu buffer, então um
+    flush atrasado não pode fazer last_seen voltar no tempo.
+    """
+    if not linhas:
+        return 0
+    attname = model._meta.get_field(campo).attname  # "chamado" -> "chamado_id"
+    model.objects.bulk_create(
+        [model(user_id=uid, last_seen=quando, **{attname: chave}) for (uid, chave), quando in linhas.items()],
+        ignore_conflicts=True,
+    )
+    grupos = {}
+    for (uid, chave), quando in linhas.items():
+        grupos.setdefault((uid, quando), []).append(chave)
+    for (uid, quando), chaves in grupos.items():
+        model.objects.filter(
+            user_id=uid, last_seen__lt=quando, **{f"{attname}__in": chaves}
+        ).update(last_seen=quando)
+    return len(linhas)
+
+
+def _gravar(chamados: dict, secoes: dict):
+    if chamados:
+        # chamado excluído entre o "visto" e o flush não pode derrubar o lote inteiro (FK)
+        existentes = set(
+            Chamado.objects.filter(pk__in={cid for _, cid in chamados}).values_list("pk", flat=True)
+        )
+        chamados = {k: v for k, v in chamados.items() if k[1] in existentes}
+    with transaction.atomic():
+        upsert_vistas(ChamadoVista, "chamado", chamados)
+        upsert_vistas(SecaoVista, "secao", secoes)
+
+
+# --- Buffer ---
+
+class BufferVistas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chamados = {}   # (user_id, chamado_id) -> datetime
+        self._secoes = {}     # (user_id, secao) -> datetime
+        self._gravando = ({}, {})  # lote em flush (ainda visível para leitura)
+        self._thread = None
+
+    def registrar(self, chamados: dict, secoes: dict):
+        with self._lock:
+            _mesclar(self._chamados, chamados)
+            _mesclar(self._secoes, secoes)
+        self._iniciar_flusher()
+
+    def pendentes_chamados(self, user_id, chamado_ids) -> dict:
+        out = {}
+        with self._lock:
+            for fonte in (self._gravando[0], self._chamados):
+                _mesclar(out, {cid: fonte[(user_id, cid)] for cid in chamado_ids if (user_id, cid) in fonte})
+        return out
+
+    def pendentes_secoes(self, user_id) -> dict:
+        out = {}
+        with self._lock:
+            for fonte in (self._gravando[1], self._secoes):
+                _mesclar(out, {secao: quando for (uid, secao), quando in fonte.items() if uid == user_id})
+        return out
+
+    def flush(self) -> int:
+        with self._lock:
+            chamados, self._chamados = self._chamados, {}
+            secoes, self._secoes = self._secoes, {}
+            self._gravando = (chamados, secoes)
+        if not (chamados or secoes):
+            return 0
+        try:
+            _gravar(chamados, secoes)
+        except Exception:
+            # devolve ao buffer para a próxima rodada
+            with self._lock:
+                _mesclar(self._chamados, chamados)
+                _mesclar(self._secoes, secoes)
+            raise
+        finally:
+            with self._lock:
+                self._gravando = ({}, {})
+        return len(chamados) + len(secoes)
+
+    def _iniciar_flusher(self):
+        # após fork o thread não existe mais no filho (is_alive() == False)
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            primeira_vez = self._thread is None
+            self._thread = threading.Thread(target=self._loop, name="solicitacoes-vistas-flush", daemon=True)
+            self._thread.start()
+        if primeira_vez:
+            atexit.register(self._flush_seguro)
+
+    def _loop(self):
+        while True:
+            time.sleep(_intervalo())
+            self._flush_seguro()
+
+    def _flush_seguro(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Falha ao gravar marcadores de 'visto'")
+        finally:
+            connections.close_all()  # conexões deste thread
+
+
+_buffer = BufferVistas()
+
+
+# --- API usada pelas views/services ---
+
+def registrar_chamados_vistos(user, chamado_ids, quando=None) -> int:
+    """Marca os chamados como vistos pelo usuário."""
+    quando = quando or timezone.now()
+    linhas = {(user.pk, int(cid)): quando for cid in chamado_ids}
+    if not linhas:
+        return 0
+    if _intervalo() <= 0:
+        _gravar(linhas, {})
+    else:
+        _buffer.registrar(linhas, {})
+    return len(linhas)
+
+
+def registrar_secao_vista(user, secao: str, quando=None) -> int:
+    """Marca a seção de Meus Chamados/Gerenciar como vista pelo usuário."""
+    linhas = {(user.pk, secao): quando or timezone.now()}
+    if _intervalo() <= 0:
+        _gravar({}, linhas)
+    else:
+        _buffer.registrar({}, linhas)
+    return 1
+
+
+def ultimas_vistas_chamados(user, chamado_ids) -> dict:
+    """{chamado_id: last_seen} do usuário, já mesclado com o buffer."""
+    vistas = dict(
+        ChamadoVista.objects.filter(user=user, chamado_id__in=chamado_ids)
+        .values_list("chamado_id", "last_seen")
+    )
+    _mesclar(vistas, _buffer.pendentes_chamados(user.pk, chamado_ids))
+    return vistas
+
+
+def secoes_vistas_pendentes(user) -> dict:
+    """{secao: last_seen} ainda no buffer (não gravados) para o usuário."""
+    return _buffer.pendentes_secoes(user.pk)
+
+
+def flush_vistas() -> int:
+    """Grava já o que estiver no buffer (usado em testes/comandos)."""
+    return _buffer.flush()